@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Incremental document ingestion for the PDF Q&A notebook.
+
+Instead of reloading, re-splitting and re-embedding everything on every
+run (as PDF_GPT.ipynb does), this keeps a manifest next to the vector
+store recording each file's content hash and the hash of every chunk it
+produced. On the next run unchanged files are skipped, and for changed
+files only chunks whose text is new get embedded; chunks that disappeared
+are deleted from the store.
+
+The embedder is pluggable: `minilm` uses the same sentence-transformers
+model as the notebook, `hash` is a deterministic local embedder that needs
+no download (useful offline and for checking the pipeline end to end).
+The store is the notebook's persisted Chroma directory when chromadb is
+installed (the same `langchain` collection that the notebook's
+`Chroma(persist_directory="./db")` retriever reads), and a small NumPy
+store otherwise.
+
+A store that already holds chunks but has no manifest (e.g. one the
+notebook built) is not ingested into: its chunks are keyed differently and
+would be duplicated. Pass --reset to replace them.
+
+Usage:
+    python pdf_ingest.py ingest book.pdf notes/ --db ./db --batch-size 64
+    python pdf_ingest.py ingest book.pdf --db ./db --reset   # replace a notebook-built collection
+    python pdf_ingest.py query "What does chapter 2 argue?" --db ./db -k 4
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import zlib
+
+import numpy as np
+
+try:
+    import chromadb
+except ImportError:
+    chromadb = None
+
+try:
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+except ImportError:
+    RecursiveCharacterTextSplitter = None
+
+MANIFEST_FILE = 'ingest_manifest.json'
+# LangChain's default collection name, so the notebook's Chroma(persist_directory="./db") sees the chunks
+COLLECTION_NAME = 'langchain'
+# The notebook embeds with all-MiniLM-L6-v2, so a collection it built can be queried with 'minilm'
+NOTEBOOK_EMBEDDER = 'minilm'
+SUPPORTED_EXTENSIONS = ('.pdf', '.txt', '.md')
+
+# Same splitting parameters as the notebook
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def load_text(path):
+    """Extract the text of a PDF (via pypdf) or read a plain text file"""
+    if path.lower().endswith('.pdf'):
+        from pypdf import PdfReader
+        reader = PdfReader(path)
+        return '\n\n'.join(page.extract_text() or '' for page in reader.pages)
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read()
+
+
+def _split_recursive(text, chunk_size, separators):
+    """Split text into pieces no longer than chunk_size, preferring the earliest separator that works"""
+    if len(text) <= chunk_size:
+        return [text] if text.strip() else []
+    separator = next((s for s in separators if s and s in text), '')
+    if not separator:
+        return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+    remaining = separators[separators.index(separator) + 1:]
+    pieces = []
+    for part in text.split(separator):
+        if len(part) > chunk_size:
+            pieces.extend(_split_recursive(part, chunk_size, remaining))
+        elif part.strip():
+            pieces.append(part)
+    return pieces
+
+
+def split_text(text, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Split text into overlapping chunks (LangChain's splitter when installed)"""
+    if RecursiveCharacterTextSplitter is not None:
+        splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        return splitter.split_text(text)
+
+    chunks = []
+    current = ''
+    for piece in _split_recursive(text, chunk_size, ['\n\n', '\n', ' ']):
+        if current and len(current) + 1 + len(piece) > chunk_size:
+            chunks.append(current.strip())
+            # Carry the tail of the previous chunk over as overlap, cut at a word boundary
+            tail = current[-chunk_overlap:] if chunk_overlap else ''
+            current = tail[tail.find(' ') + 1:] if ' ' in tail else tail
+        current = f"{current} {piece}" if current else piece
+    if current.strip():
+        chunks.append(current.strip())
+    return chunks
+
+
+class HashEmbedder:
+    """Deterministic feature-hashing embedder: no model download, stable across runs"""
+
+    name = 'hash'
+
+    def __init__(self, dimensions=384):
+        self.dimensions = dimensions
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r'[a-z0-9]+', text.lower()):
+                h = zlib.crc32(word.encode('utf-8'))
+                vectors[row, h % self.dimensions] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+
+class MiniLMEmbedder:
+    """The notebook's sentence-transformers/all-MiniLM-L6-v2 embeddings"""
+
+    name = 'minilm'
+
+    def __init__(self, model_name='sentence-transformers/all-MiniLM-L6-v2'):
+        from langchain_huggingface import HuggingFaceEmbeddings
+        import torch
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.model = HuggingFaceEmbeddings(model_name=model_name, model_kwargs={"device": device})
+
+    def embed(self, texts):
+        return np.asarray(self.model.embed_documents(list(texts)), dtype=np.float32)
+
+
+EMBEDDERS = {'hash': HashEmbedder, 'minilm': MiniLMEmbedder}
+
+
+class ChromaStore:
+    """Chunks in a persistent Chroma collection"""
+
+    def __init__(self, db_dir):
+        self.client = chromadb.PersistentClient(path=db_dir)
+        self.collection = self.client.get_or_create_collection(COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
+
+    def upsert(self, ids, vectors, documents, metadatas):
+        self.collection.upsert(ids=ids, embeddings=vectors.tolist(), documents=documents, metadatas=metadatas)
+
+    def delete(self, ids):
+        if ids:
+            self.collection.delete(ids=ids)
+
+    def count(self):
+        return self.collection.count()
+
+    def reset(self):
+        self.client.delete_collection(COLLECTION_NAME)
+        self.collection = self.client.get_or_create_collection(COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
+
+    def query(self, vector, k):
+        result = self.collection.query(query_embeddings=[vector.tolist()], n_results=k)
+        # A collection created by LangChain uses Chroma's default squared-L2 space; for unit vectors
+        # that is 2 - 2 * cosine, while our own collections use cosine distance (1 - cosine)
+        space = (self.collection.metadata or {}).get('hnsw:space', 'l2')
+        to_score = (lambda dist: 1 - dist / 2) if space == 'l2' else (lambda dist: 1 - dist)
+        return [
+            {'id': i, 'text': d, 'source': (m or {}).get('source'), 'score': to_score(dist)}
+            for i, d, m, dist in zip(result['ids'][0], result['documents'][0], result['metadatas'][0], result['distances'][0])
+        ]
+
+    def save(self):
+        pass
+
+
+class NumpyStore:
+    """Fallback store: one float32 matrix plus chunk metadata, brute-force cosine search"""
+
+    def __init__(self, db_dir):
+        self.vectors_path = os.path.join(db_dir, 'chunks.npy')
+        self.meta_path = os.path.join(db_dir, 'chunks.json')
+        self.ids, self.documents, self.metadatas = [], [], []
+        self.vectors = None
+        if os.path.exists(self.meta_path) and os.path.exists(self.vectors_path):
+            with open(self.meta_path, 'r') as f:
+                meta = json.load(f)
+            self.ids, self.documents, self.metadatas = meta['ids'], meta['documents'], meta['metadatas']
+            self.vectors = np.load(self.vectors_path)
+
+    def upsert(self, ids, vectors, documents, metadatas):
+        self.delete(ids)
+        self.ids.extend(ids)
+        self.documents.extend(documents)
+        self.metadatas.extend(metadatas)
+        self.vectors = vectors if self.vectors is None else np.vstack([self.vectors, vectors])
+
+    def delete(self, ids):
+        drop = set(ids)
+        if not drop or not self.ids:
+            return
+        keep = [i for i, chunk_id in enumerate(self.ids) if chunk_id not in drop]
+        self.ids = [self.ids[i] for i in keep]
+        self.documents = [self.documents[i] for i in keep]
+        self.metadatas = [self.metadatas[i] for i in keep]
+        self.vectors = self.vectors[keep] if keep else None
+
+    def reset(self):
+        self.ids, self.documents, self.metadatas = [], [], []
+        self.vectors = None
+
+    def count(self):
+        return len(self.ids)
+
+    def query(self, vector, k):
+        if self.vectors is None:
+            return []
+        norms = np.linalg.norm(self.vectors, axis=1) * (np.linalg.norm(vector) or 1)
+        norms[norms == 0] = 1
+        scores = (self.vectors @ vector) / norms
+        return [
+            {'id': self.ids[i], 'text': self.documents[i], 'source': self.metadatas[i].get('source'), 'score': float(scores[i])}
+            for i in np.argsort(-scores)[:k]
+        ]
+
+    def save(self):
+        with open(self.meta_path, 'w') as f:
+            json.dump({'ids': self.ids, 'documents': self.documents, 'metadatas': self.metadatas}, f)
+        if self.vectors is not None:
+            np.save(self.vectors_path, self.vectors)
+        elif os.path.exists(self.vectors_path):
+            os.remove(self.vectors_path)
+
+
+def open_store(db_dir, backend='auto'):
+    os.makedirs(db_dir, exist_ok=True)
+    if backend == 'chroma' or (backend == 'auto' and chromadb is not None):
+        return ChromaStore(db_dir)
+    return NumpyStore(db_dir)
+
+
+class Ingestor:
+    def __init__(self, db_dir='./db', embedder=None, batch_size=64, backend='auto',
+                 chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+        self.db_dir = db_dir
+        self.embedder = embedder or HashEmbedder()
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.store = open_store(db_dir, backend)
+        self.manifest_path = os.path.join(db_dir, MANIFEST_FILE)
+        # Chunks present without a manifest were written by something else (usually the notebook)
+        self.unmanaged_chunks = 0 if os.path.exists(self.manifest_path) else self.store.count()
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        return {'embedder': self.embedder.name, 'files': {}}
+
+    def _embedder_mismatch(self):
+        """Name of the embedder the store was built with, if it is not ours and the store has chunks"""
+        built_with = self.manifest.get('embedder')
+        if built_with != self.embedder.name and self.manifest.get('files'):
+            return built_with
+        return None
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def ingest_file(self, path, stats):
+        """Ingest one file, embedding only chunks that are not in the store yet"""
+        source = os.path.abspath(path)
+        with open(path, 'rb') as f:
+            file_hash = sha256_bytes(f.read())
+        previous = self.manifest['files'].get(source)
+        if previous and previous['sha256'] == file_hash:
+            stats['files_skipped'] += 1
+            return
+
+        chunks = split_text(load_text(path), self.chunk_size, self.chunk_overlap)
+        source_key = sha256_bytes(source.encode('utf-8'))[:12]
+        chunk_ids = {}
+        for position, chunk in enumerate(chunks):
+            chunk_ids.setdefault(f"{source_key}-{sha256_bytes(chunk.encode('utf-8'))[:24]}", (position, chunk))
+
+        old_ids = set(previous['chunks']) if previous else set()
+        new_ids = [chunk_id for chunk_id in chunk_ids if chunk_id not in old_ids]
+        removed = sorted(old_ids - set(chunk_ids))
+
+        for start in range(0, len(new_ids), self.batch_size):
+            batch = new_ids[start:start + self.batch_size]
+            texts = [chunk_ids[i][1] for i in batch]
+            started = time.perf_counter()
+            vectors = self.embedder.embed(texts)
+            stats['embed_seconds'] += time.perf_counter() - started
+            self.store.upsert(batch, vectors, texts, [{'source': source, 'position': chunk_ids[i][0]} for i in batch])
+        self.store.delete(removed)
+
+        self.manifest['files'][source] = {'sha256': file_hash, 'chunks': sorted(chunk_ids)}
+        stats['files_ingested'] += 1
+        stats['chunks_embedded'] += len(new_ids)
+        stats['chunks_unchanged'] += len(chunk_ids) - len(new_ids)
+        stats['chunks_deleted'] += len(removed)
+
+    def ingest(self, paths, reset=False):
+        """Ingest files and directories, returning throughput statistics
+
+        Raises ValueError if the store holds chunks without a manifest, unless reset is set.
+        """
+        stats = dict.fromkeys(('files_ingested', 'files_skipped', 'chunks_embedded', 'chunks_unchanged',
+                               'chunks_deleted', 'embed_seconds'), 0)
+        if self.unmanaged_chunks:
+            if not reset:
+                raise ValueError(f"{self.db_dir} already holds {self.unmanaged_chunks} chunks with no ingest manifest "
+                                 f"(e.g. from the notebook); ingesting would duplicate them - use --reset to replace them")
+            print(f"⚠️  Replacing {self.unmanaged_chunks} chunks that have no ingest manifest")
+            self.store.reset()
+            self.store.save()
+            self.unmanaged_chunks = 0
+        built_with = self._embedder_mismatch()
+        if built_with:
+            # Vectors from different embedders cannot share a store, so start over
+            print(f"⚠️  Store was built with the '{built_with}' embedder - re-embedding everything")
+            self.store.reset()
+            self.store.save()
+        if built_with or self.manifest.get('embedder') != self.embedder.name:
+            self.manifest = {'embedder': self.embedder.name, 'files': {}}
+            self._save_manifest()
+        started = time.perf_counter()
+        for path in iter_documents(paths):
+            try:
+                self.ingest_file(path, stats)
+            except Exception as e:
+                print(f"❌ Failed to ingest {path}: {e}")
+            else:
+                # Persist progress per file so an interrupted run resumes where it stopped
+                self.store.save()
+                self._save_manifest()
+        stats['seconds'] = time.perf_counter() - started
+        stats['chunks_per_second'] = stats['chunks_embedded'] / stats['seconds'] if stats['seconds'] else 0.0
+        return stats
+
+    def query(self, question, k=4):
+        """Return the k most similar chunks and the query latency in milliseconds
+
+        Raises ValueError if the store was built with a different embedder.
+        """
+        if self.unmanaged_chunks and self.embedder.name != NOTEBOOK_EMBEDDER:
+            raise ValueError(f"the store has no ingest manifest, so it was presumably built by the notebook with "
+                             f"'{NOTEBOOK_EMBEDDER}'; query with --embedder {NOTEBOOK_EMBEDDER}")
+        built_with = self._embedder_mismatch()
+        if built_with:
+            raise ValueError(f"the store was built with the '{built_with}' embedder; "
+                             f"query with --embedder {built_with} or re-ingest with --embedder {self.embedder.name}")
+        started = time.perf_counter()
+        vector = self.embedder.embed([question])[0]
+        results = self.store.query(vector, k)
+        return results, (time.perf_counter() - started) * 1000
+
+
+def iter_documents(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                        yield os.path.join(root, name)
+        elif os.path.exists(path):
+            yield path
+        else:
+            print(f"⚠️  Skipping missing path: {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally ingest and query documents for PDF Q&A")
+    parser.add_argument('--db', default='./db', help="vector store directory")
+    parser.add_argument('--embedder', choices=sorted(EMBEDDERS), default='minilm')
+    parser.add_argument('--backend', choices=['auto', 'chroma', 'numpy'], default='auto')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest = commands.add_parser('ingest', help="ingest files or directories")
+    ingest.add_argument('paths', nargs='+')
+    ingest.add_argument('--batch-size', type=int, default=64)
+    ingest.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    ingest.add_argument('--chunk-overlap', type=int, default=CHUNK_OVERLAP)
+    ingest.add_argument('--reset', action='store_true', help="replace chunks that have no ingest manifest")
+
+    query = commands.add_parser('query', help="retrieve the chunks most similar to a question")
+    query.add_argument('question')
+    query.add_argument('-k', type=int, default=4)
+
+    args = parser.parse_args(argv)
+    embedder = EMBEDDERS[args.embedder]()
+
+    if args.command == 'ingest':
+        ingestor = Ingestor(args.db, embedder, batch_size=max(1, args.batch_size), backend=args.backend,
+                            chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+        try:
+            stats = ingestor.ingest(args.paths, reset=args.reset)
+        except ValueError as e:
+            print(f"❌ Cannot ingest: {e}")
+            return 1
+        print(f"✅ Ingested {stats['files_ingested']} files, skipped {stats['files_skipped']} unchanged")
+        print(f"📊 Chunks: {stats['chunks_embedded']} embedded, {stats['chunks_unchanged']} unchanged, "
+              f"{stats['chunks_deleted']} deleted")
+        print(f"⏱️  {stats['seconds']:.2f}s total, {stats['embed_seconds']:.2f}s embedding, "
+              f"{stats['chunks_per_second']:.1f} chunks/s")
+    else:
+        ingestor = Ingestor(args.db, embedder, backend=args.backend)
+        try:
+            results, latency_ms = ingestor.query(args.question, args.k)
+        except ValueError as e:
+            print(f"❌ Cannot query: {e}")
+            return 1
+        for rank, result in enumerate(results, 1):
+            print(f"--- {rank}. {result['source']} (score {result['score']:.3f}) ---")
+            print(result['text'][:500])
+        print(f"⏱️  Query took {latency_ms:.1f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,7 +2,7 @@ import sys
 print(f"Python version: {sys.version}")
 print(f"Python executable: {sys.executable}")
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, send_file
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, send_from_directory, Response, stream_with_context, g
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 import requests
@@ -14,11 +14,27 @@ import random
 import uuid
 import hashlib
 import base64
-from io import BytesIO
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from security import security_manager
+import user_export
+from article_archive import article_archive
+from search_index import search_index
+from summarizer import summary_cache, lead_notes
+from related_index import related_index
+import news_scraper
+from image_proxy import thumbnail_cache, pick_width, FORMATS as THUMBNAIL_FORMATS, ImageProxyError
+from urllib.parse import unquote
+import re
+from upstream import single_flight, quota_governor, topic_cache, circuit_breakers, QuotaExhausted, CircuitOpen, NEWSAPI_LATENCY_BUDGET
+from topic_classifier import TopicClassifier
+from warm_start import WarmStartSnapshot
+from trending import TrendingTracker
+from profiler import request_profiler
+import atexit
+import signal
 
 print("All imports successful - Deployment version 1.3 - EXCEL EXPORT FIX")
 
@@ -26,6 +42,8 @@ print("All imports successful - Deployment version 1.3 - EXCEL EXPORT FIX")
 load_dotenv()
 
 app = Flask(__name__)
+# Keep article dicts in insertion order; sorting keys only costs serialization time
+app.json.sort_keys = False
 
 # Load API keys from environment variables
 openai.api_key = os.getenv('OPENAI_API_KEY')
@@ -217,29 +235,14 @@ def require_auth(f):
     return decorated_function
 
 def get_news_image(topic):
-    """Get placeholder image for topic - no AI generation"""
-    config = TOPIC_CONFIGS.get(topic, TOPIC_CONFIGS['inflation'])
-    return config['placeholder']
+    """Get placeholder image URL for topic - served once as a cacheable asset"""
+    if topic not in TOPIC_CONFIGS:
+        topic = 'inflation'
+    return f"/placeholder/{topic}.svg"
 
 def create_quick_notes(text):
-    """Create quick notes instead of AI summaries"""
-    if not text:
-        return "No content available for quick notes."
-    
-    # Simple text processing to create quick notes
-    sentences = text.split('.')[:3]  # Take first 3 sentences
-    quick_notes = []
-    
-    for sentence in sentences:
-        sentence = sentence.strip()
-        if len(sentence) > 10:  # Only meaningful sentences
-            # Add bullet point
-            quick_notes.append(f"• {sentence}")
-    
-    if not quick_notes:
-        return "• Key information not available in this format"
-    
-    return '\n'.join(quick_notes)
+    """Create quick notes from the lead sentences (see summarizer.summary_cache for ranked notes)"""
+    return lead_notes(text)
 
 def get_demo_news_for_topic(topic, num_articles=1):
     """Get demo news articles when API key is not available"""
@@ -262,119 +265,410 @@ def get_demo_news_for_topic(topic, num_articles=1):
             'likes': 0,
             'dislikes': 0,
             'views': 0,
-            'image_url': config['placeholder'],
+            'image_url': get_news_image(topic),
             'is_generated': False
         })
     
     return demo_articles
 
+def normalize_article(article, topic, article_data):
+    """Turn one raw NewsAPI article into the dict the frontend expects"""
+    config = TOPIC_CONFIGS.get(topic, TOPIC_CONFIGS['inflation'])
+    title = article.get("title", "No Title")
+    description = article.get("description") or article.get("content") or ""
+    url_link = article.get("url", "")
+    published_at = article.get("publishedAt", "")
+    source = article.get("source", {}).get("name", "Unknown Source")
+    
+    # Generate article ID
+    article_id = generate_article_id(title, published_at)
+    
+    # Get engagement data
+    engagement = article_data.get(article_id, {
+        'likes': 0,
+        'dislikes': 0,
+        'views': 0,
+        'created_at': datetime.now().isoformat()
+    })
+    
+    # Format published date
+    if published_at:
+        try:
+            dt = datetime.fromisoformat(published_at.replace('Z', '+00:00'))
+            formatted_date = dt.strftime("%B %d, %Y at %I:%M %p")
+        except:
+            formatted_date = published_at
+    else:
+        formatted_date = "Unknown date"
+    
+    # Get image URL - publisher images go through the /img thumbnail proxy, which
+    # validates the actual bytes; articles without one use the topic placeholder
+    url_to_image = (article.get("urlToImage") or "").strip()
+    if url_to_image and url_to_image != "null" and url_to_image.startswith(('http://', 'https://')):
+        image_source = url_to_image
+        image_url = f"/img/{article_id}"
+    else:
+        image_source = None
+        image_url = get_news_image(topic)
+    
+    # Start the ranked summary now; it is looked up when the article is served (see with_engagement),
+    # so cached pages and archive records never hold the lead-sentence fallback
+    summary_cache.request(article_id, description)
+    
+    return {
+        'id': article_id,
+        'title': title,
+        'description': description,
+        'url': url_link,
+        'published_at': formatted_date,
+        'source': source,
+        'topic': topic,
+        'topic_name': config['name'],
+        'topic_icon': config['icon'],
+        'topic_color': config['color'],
+        'likes': engagement['likes'],
+        'dislikes': engagement['dislikes'],
+        'views': engagement['views'],
+        'image_url': image_url,
+        'image_source': image_source,
+        'is_generated': False  # Always false since we're not generating AI images
+    }
+
+def with_engagement(articles, article_data=None):
+    """Refresh engagement counters and quick notes on articles being served (cached, archived or fresh)"""
+    article_data = load_articles() if article_data is None else article_data
+    for article in articles:
+        engagement = article_data.get(article['id'], {})
+        article['likes'] = engagement.get('likes', 0)
+        article['dislikes'] = engagement.get('dislikes', 0)
+        article['views'] = engagement.get('views', 0)
+        # Ranked summary once the background summarizer has it, lead sentences until then
+        article['summary'] = summary_cache.summary_for(article['id'], article.get('description', ''))
+    return articles
+
+def get_archived_news_for_topic(topic, num_articles=1):
+    """Most recently archived articles for a topic, with current engagement counts"""
+    try:
+        return with_engagement(article_archive.recent(topic, num_articles))
+    except Exception as e:
+        print(f"ERROR: Failed to read archive for {topic}: {str(e)}")
+        return []
+
+def call_newsapi(endpoint, params):
+    """GET a NewsAPI endpoint through its circuit breaker, the request budget and the latency budget"""
+    breaker = circuit_breakers[endpoint]
+    if not breaker.allow():
+        raise CircuitOpen(f"NewsAPI {endpoint} circuit is open")
+    if not quota_governor.try_acquire():
+        # Nothing was sent, so this says nothing about upstream health
+        breaker.release()
+        raise QuotaExhausted(f"NewsAPI budget exhausted ({quota_governor.status()['remaining']})")
+    
+    started = time.monotonic()
+    try:
+        response = requests.get(f"https://newsapi.org/v2/{endpoint}", params=dict(params, apiKey=news_api_key),
+                                timeout=NEWSAPI_LATENCY_BUDGET)
+        response.raise_for_status()
+        data = response.json()
+    except Exception:
+        breaker.record(False, time.monotonic() - started)
+        raise
+    breaker.record(True, time.monotonic() - started)
+    return data
+
+def fetch_topic_from_newsapi(topic):
+    """Make one NewsAPI call for a topic, returning every normalized article (the caller slices)"""
+    config = TOPIC_CONFIGS.get(topic, TOPIC_CONFIGS['inflation'])
+    query = config['query']
+    
+    data = call_newsapi('everything', {'q': query, 'language': 'en', 'sortBy': 'publishedAt'})
+    articles = data.get("articles", [])
+    
+    # Load existing article data
+    article_data = load_articles()
+    
+    # Normalize everything upstream returned so the archive sees the whole page
+    processed_articles = [normalize_article(article, topic, article_data) for article in articles]
+    archive_articles(processed_articles, topic)
+    topic_cache.set(f"everything:{topic}", processed_articles)
+    
+    return processed_articles
+
 def fetch_news_by_topic(topic, num_articles=1):
     """Fetch news articles for a specific topic"""
     try:
         # Check if we have a valid API key
-        print(f"DEBUG: Checking API key for {topic}: {news_api_key[:10] if news_api_key else 'None'}...")
         if news_api_key == "placeholder-key" or not news_api_key:
             print(f"WARNING: Using demo data for {topic} - API key not set")
             return get_demo_news_for_topic(topic, num_articles)
-        else:
-            print(f"DEBUG: Using real API key for {topic}")
         
-        config = TOPIC_CONFIGS.get(topic, TOPIC_CONFIGS['inflation'])
-        query = config['query']
+        cache_key = f"everything:{topic}"
+        articles = topic_cache.get(cache_key)
+        if articles is None and cache_key in warm_start_keys:
+            # Restored from the snapshot and being refreshed in the background
+            articles = topic_cache.get(cache_key, allow_stale=True)
+        if articles is None:
+            # Concurrent requests for the same topic share a single upstream call, across workers too
+            articles = single_flight.do(cache_key, lambda: topic_cache.refresh(
+                cache_key, lambda: fetch_topic_from_newsapi(topic), timeout=NEWSAPI_LATENCY_BUDGET
+            ), timeout=NEWSAPI_LATENCY_BUDGET)
         
-        url = f"https://newsapi.org/v2/everything?q={query}&language=en&sortBy=publishedAt&apiKey={news_api_key}"
-        response = requests.get(url)
-        response.raise_for_status()
-        
-        articles = response.json().get("articles", [])
-        processed_articles = []
-        
-        # Load existing article data
-        article_data = load_articles()
-        
-        for i, article in enumerate(articles[:num_articles]):
-            title = article.get("title", "No Title")
-            description = article.get("description") or article.get("content") or ""
-            url_link = article.get("url", "")
-            published_at = article.get("publishedAt", "")
-            source = article.get("source", {}).get("name", "Unknown Source")
-            
-            # Generate article ID
-            article_id = generate_article_id(title, published_at)
-            
-            # Get engagement data
-            engagement = article_data.get(article_id, {
-                'likes': 0,
-                'dislikes': 0,
-                'views': 0,
-                'created_at': datetime.now().isoformat()
-            })
-            
-            # Format published date
-            if published_at:
-                try:
-                    dt = datetime.fromisoformat(published_at.replace('Z', '+00:00'))
-                    formatted_date = dt.strftime("%B %d, %Y at %I:%M %p")
-                except:
-                    formatted_date = published_at
-            else:
-                formatted_date = "Unknown date"
-            
-            # Get image URL - use actual image from NewsAPI if available, otherwise use placeholder
-            url_to_image = article.get("urlToImage")
-            if (url_to_image and 
-                url_to_image != "null" and 
-                url_to_image.strip() and 
-                url_to_image.startswith(('http://', 'https://')) and
-                any(ext in url_to_image.lower() for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp'])):
-                image_url = url_to_image
-                print(f"DEBUG: Using real image for {topic}: {image_url[:50]}...")
-            else:
-                image_url = get_news_image(topic)
-                print(f"DEBUG: Using placeholder image for {topic}: {image_url}")
-            
-            # Create quick notes
-            quick_notes = create_quick_notes(description)
-            
-            processed_articles.append({
-                'id': article_id,
-                'title': title,
-                'description': description,
-                'summary': quick_notes,
-                'url': url_link,
-                'published_at': formatted_date,
-                'source': source,
-                'topic': topic,
-                'topic_name': config['name'],
-                'topic_icon': config['icon'],
-                'topic_color': config['color'],
-                'likes': engagement['likes'],
-                'dislikes': engagement['dislikes'],
-                'views': engagement['views'],
-                'image_url': image_url,
-                'is_generated': False  # Always false since we're not generating AI images
-            })
-        
-        return processed_articles
+        return with_engagement([dict(article) for article in articles[:num_articles]])
     
     except Exception as e:
         print(f"ERROR: Failed to fetch {topic} news: {str(e)}")
-        print(f"DEBUG: Falling back to demo data for {topic}")
-        return get_demo_news_for_topic(topic, num_articles)
+        return get_fallback_news_for_topic(topic, num_articles)
 
-def fetch_multi_topic_news(topics, num_articles_per_topic=1):
-    """Fetch news from multiple topics and sort by popularity"""
-    all_articles = []
+def get_fallback_news_for_topic(topic, num_articles=1):
+    """Degraded mode: stale cached articles, then archived articles, then demo data"""
+    stale = topic_cache.get(f"everything:{topic}", allow_stale=True)
+    if stale:
+        print(f"DEBUG: Serving stale cached articles for {topic}")
+        return with_engagement([dict(article) for article in stale[:num_articles]])
+    archived = get_archived_news_for_topic(topic, num_articles)
+    if archived:
+        print(f"DEBUG: Falling back to {len(archived)} archived articles for {topic}")
+        return archived
+    print(f"DEBUG: Falling back to demo data for {topic}")
+    return get_demo_news_for_topic(topic, num_articles)
+
+def archive_articles(articles, topic):
+    """Append newly seen articles to the on-disk archive and the search index"""
+    try:
+        written = article_archive.add_many(articles, topic)
+        if written:
+            print(f"DEBUG: Archived {written} new {topic} articles ({len(article_archive)} total)")
+    except Exception as e:
+        print(f"ERROR: Failed to archive {topic} articles: {str(e)}")
+    try:
+        search_index.add_articles(articles)
+        related_index.add_articles(articles)
+    except Exception as e:
+        print(f"ERROR: Failed to index {topic} articles: {str(e)}")
+
+def index_archived_articles():
+    """Rebuild the search and related-article indexes from recently archived articles"""
+    since = time.time() - search_index.max_age_seconds
+    indexed = 0
+    for article_id in article_archive.iter_ids(since=since):
+        article = article_archive.get(article_id)
+        if article and search_index.add(article_id, article.get('title', ''), article.get('description', ''),
+                                        article.get('topic', ''), added_at=article['archived_at']):
+            related_index.add_articles([article])
+            indexed += 1
+    print(f"DEBUG: Search index loaded {indexed} archived articles")
+
+try:
+    index_archived_articles()
+except Exception as e:
+    print(f"ERROR: Failed to load search index from archive: {str(e)}")
+
+def scrape_extra_sources(sources, crawler):
+    """Crawl configured sources once and feed the results through the normal article pipeline"""
+    article_data = load_articles()
+    for topic, seed_urls in sources.items():
+        if topic not in TOPIC_CONFIGS:
+            print(f"WARNING: Skipping scraper sources for unknown topic {topic}")
+            continue
+        raw_articles = crawler.crawl(seed_urls)
+        processed_articles = [normalize_article(article, topic, article_data) for article in raw_articles]
+        archive_articles(processed_articles, topic)
+        stats = crawler.stats
+        print(f"DEBUG: Scraped {stats['articles']} {topic} articles from {stats['pages']} pages "
+              f"({stats['pages_per_second']:.1f} pages/s)")
+
+def start_scraper():
+    """Run the extra-source scraper in a background thread if SCRAPER_SOURCES is configured"""
+    sources = news_scraper.load_sources()
+    if not sources:
+        return None
+    interval = int(os.getenv('SCRAPER_INTERVAL_SECONDS', 900))
+    crawler = news_scraper.Crawler(
+        politeness_delay=float(os.getenv('SCRAPER_DELAY', 1.0)),
+        validators_file='scraper_validators.json'
+    )
+    
+    def run():
+        while True:
+            try:
+                scrape_extra_sources(sources, crawler)
+            except Exception as e:
+                print(f"ERROR: Scraper run failed: {str(e)}")
+            time.sleep(interval)
     
+    thread = threading.Thread(target=run, name='scraper', daemon=True)
+    thread.start()
+    print(f"Scraper started for topics: {', '.join(sources)} (every {interval}s)")
+    return thread
+
+# Shared pool for fetching topics concurrently (used by the streaming endpoint)
+news_executor = ThreadPoolExecutor(max_workers=len(TOPIC_CONFIGS), thread_name_prefix='news')
+
+# 'per_topic' makes one NewsAPI call per topic; 'combined' sends OR-combined queries and
+# splits the results into topics locally with topic_classifier
+MULTI_TOPIC_MODE = os.getenv('MULTI_TOPIC_MODE', 'per_topic')
+# NewsAPI rejects q longer than 500 characters, and pageSize above 100
+NEWSAPI_MAX_QUERY_LENGTH = 500
+NEWSAPI_MAX_PAGE_SIZE = 100
+
+topic_classifier = TopicClassifier({topic: config['query'] for topic, config in TOPIC_CONFIGS.items()})
+
+# Exponentially decayed engagement, so "hot right now" can be told apart from lifetime totals
+trending_tracker = TrendingTracker(
+    half_life_hours=float(os.getenv('TRENDING_HALF_LIFE_HOURS', 6)),
+    k=int(os.getenv('TRENDING_TOP_K', 50))
+)
+
+def config_topic(topic):
+    """The configured topic whose query serves `topic` (unknown topics use inflation, as elsewhere)"""
+    return topic if topic in TOPIC_CONFIGS else 'inflation'
+
+def build_combined_queries(topics, max_length=NEWSAPI_MAX_QUERY_LENGTH):
+    """OR-combine topic queries into as few NewsAPI q strings as fit the length limit"""
+    queries = []
+    current = []
+    for topic in dict.fromkeys(config_topic(topic) for topic in topics):
+        clause = f"({TOPIC_CONFIGS[topic]['query']})"
+        candidate = ' OR '.join(current + [clause])
+        if current and len(candidate) > max_length:
+            queries.append(' OR '.join(current))
+            current = [clause]
+        else:
+            current.append(clause)
+    if current:
+        queries.append(' OR '.join(current))
+    return queries
+
+def fetch_combined_from_newsapi(topics):
+    """One NewsAPI call per combined query; returns topic -> normalized articles"""
+    article_data = load_articles()
+    by_topic = {topic: [] for topic in topics}
+    for query in build_combined_queries(topics):
+        data = call_newsapi('everything', {
+            'q': query,
+            'language': 'en',
+            'sortBy': 'publishedAt',
+            'pageSize': NEWSAPI_MAX_PAGE_SIZE
+        })
+        for article in data.get("articles", []):
+            topic = topic_classifier.classify(article.get('title') or '', article.get('description') or '', topics)
+            if topic:
+                by_topic[topic].append(normalize_article(article, topic, article_data))
+    for topic, articles in by_topic.items():
+        archive_articles(articles, topic)
+    topic_cache.set("combined:" + ','.join(sorted(topics)), by_topic)
+    return by_topic
+
+def fetch_multi_topic_news_combined(topics, num_articles_per_topic=1):
+    """Fetch several topics with combined upstream queries, falling back per topic on failure"""
+    if news_api_key == "placeholder-key" or not news_api_key:
+        return [a for topic in topics for a in get_demo_news_for_topic(topic, num_articles_per_topic)]
+    
+    # Topics without a config share a configured topic's query: fetch and classify each query once
+    # and give that topic their share of the articles, instead of leaving them unclassified
+    shares = {}
+    for topic in topics:
+        shares[config_topic(topic)] = shares.get(config_topic(topic), 0) + 1
+    topics = list(shares)
+    
+    cache_key = "combined:" + ','.join(sorted(topics))
+    try:
+        by_topic = topic_cache.get(cache_key)
+        if by_topic is None and cache_key in warm_start_keys:
+            by_topic = topic_cache.get(cache_key, allow_stale=True)
+        if by_topic is None:
+            by_topic = single_flight.do(cache_key, lambda: topic_cache.refresh(
+                cache_key, lambda: fetch_combined_from_newsapi(topics), timeout=NEWSAPI_LATENCY_BUDGET
+            ), timeout=NEWSAPI_LATENCY_BUDGET)
+    except Exception as e:
+        print(f"ERROR: Failed to fetch combined news for {', '.join(topics)}: {str(e)}")
+        by_topic = topic_cache.get(cache_key, allow_stale=True) or {}
+    
+    article_data = load_articles()
+    all_articles = []
     for topic in topics:
-        articles = fetch_news_by_topic(topic, num_articles_per_topic)
-        all_articles.extend(articles)
+        count = num_articles_per_topic * shares[topic]
+        articles = by_topic.get(topic) or []
+        if articles:
+            all_articles.extend(with_engagement([dict(article) for article in articles[:count]], article_data))
+        else:
+            all_articles.extend(get_fallback_news_for_topic(topic, count))
+    return all_articles
+
+def fetch_multi_topic_news(topics, num_articles_per_topic=1, mode=None):
+    """Fetch news from multiple topics and sort by popularity"""
+    if (mode or MULTI_TOPIC_MODE) == 'combined':
+        all_articles = fetch_multi_topic_news_combined(topics, num_articles_per_topic)
+    else:
+        all_articles = []
+        for topic in topics:
+            articles = fetch_news_by_topic(topic, num_articles_per_topic)
+            all_articles.extend(articles)
     
-    # Sort by popularity (likes - dislikes) and then by views
-    all_articles.sort(key=lambda x: (x.get('likes', 0) - x.get('dislikes', 0), x.get('views', 0)), reverse=True)
+    # Sort by recent (decayed) engagement, then lifetime popularity (likes - dislikes), then views
+    rates = trending_tracker.rates([article.get('id') for article in all_articles])
+    all_articles.sort(key=lambda x: (rates.get(x.get('id'), {}).get('score', 0.0),
+                                     x.get('likes', 0) - x.get('dislikes', 0), x.get('views', 0)), reverse=True)
     
     return all_articles
 
+# Warm start: topic results, engagement and trending counters survive restarts and sleeps
+warm_start_snapshot = WarmStartSnapshot(os.getenv('WARM_START_PATH', 'warm_start.snapshot'))
+WARM_START_INTERVAL = int(os.getenv('WARM_START_INTERVAL_SECONDS', 300))
+# Cache keys served stale from the snapshot until their background refresh finishes
+warm_start_keys = set()
+
+def save_warm_start_snapshot():
+    try:
+        saved = warm_start_snapshot.save(topic_cache, load_articles(), trending_tracker)
+        if saved:
+            print(f"DEBUG: Saved warm-start snapshot of {saved} topic results")
+    except Exception as e:
+        print(f"ERROR: Failed to save warm-start snapshot: {str(e)}")
+
+def refresh_warm_start_keys(keys):
+    """Refetch snapshot-restored results, one key at a time, then stop serving them stale"""
+    for key in keys:
+        try:
+            if key.startswith('everything:'):
+                topic = key.split(':', 1)[1]
+                fetch = lambda: fetch_topic_from_newsapi(topic)
+            else:
+                topics = key.split(':', 1)[1].split(',')
+                fetch = lambda: fetch_combined_from_newsapi(topics)
+            single_flight.do(key, lambda: topic_cache.refresh(key, fetch))
+        except Exception as e:
+            print(f"ERROR: Warm-start refresh of {key} failed: {str(e)}")
+        finally:
+            warm_start_keys.discard(key)
+
+def start_warm_start():
+    """Restore the snapshot, refresh it in the background and keep saving it"""
+    try:
+        article_data = load_articles()
+        stale_keys, engagement_added = warm_start_snapshot.restore(topic_cache, article_data, trending_tracker)
+        if engagement_added:
+            save_articles(article_data)
+    except Exception as e:
+        print(f"ERROR: Failed to restore warm-start snapshot: {str(e)}")
+        stale_keys = []
+    if stale_keys and news_api_key and news_api_key != "placeholder-key":
+        warm_start_keys.update(stale_keys)
+        print(f"DEBUG: Warm start restored {len(stale_keys)} topic results, refreshing in the background")
+        threading.Thread(target=refresh_warm_start_keys, args=(stale_keys,), name='warm-start-refresh',
+                         daemon=True).start()
+    
+    def run():
+        while True:
+            time.sleep(WARM_START_INTERVAL)
+            save_warm_start_snapshot()
+    
+    threading.Thread(target=run, name='warm-start-snapshot', daemon=True).start()
+    atexit.register(save_warm_start_snapshot)
+    # Render stops instances with SIGTERM; exit through atexit so the snapshot is written
+    if threading.current_thread() is threading.main_thread() and signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
 @app.route('/')
 def index():
     """Main page - show news even if not logged in"""
@@ -466,6 +760,37 @@ def logout():
     flash('You have been logged out successfully.', 'info')
     return redirect(url_for('login'))
 
+# Fields an /api/news article can carry, and the subset sent in compact mode
+# (topic metadata is sent once per topic, and the summary stands in for the description)
+ARTICLE_FIELDS = ('id', 'title', 'description', 'summary', 'url', 'published_at', 'source', 'topic',
+                  'topic_name', 'topic_icon', 'topic_color', 'likes', 'dislikes', 'views', 'image_url', 'is_generated')
+COMPACT_FIELDS = ('id', 'title', 'summary', 'url', 'published_at', 'source', 'topic',
+                  'likes', 'dislikes', 'views', 'image_url')
+
+def shape_news_response(articles, fields=None, compact=False):
+    """Project articles onto the requested fields; compact mode also references topic metadata by key"""
+    if fields:
+        wanted = [f for f in fields if f in ARTICLE_FIELDS]
+    else:
+        wanted = COMPACT_FIELDS if compact else ARTICLE_FIELDS
+    shaped = [{f: article[f] for f in wanted if f in article} for article in articles]
+    
+    if not compact:
+        return shaped
+    
+    topics = {}
+    for article in articles:
+        topic = article.get('topic')
+        if topic in TOPIC_CONFIGS and topic not in topics:
+            config = TOPIC_CONFIGS[topic]
+            topics[topic] = {
+                'name': config['name'],
+                'icon': config['icon'],
+                'color': config['color'],
+                'placeholder': get_news_image(topic)
+            }
+    return {'topics': topics, 'articles': shaped}
+
 @app.route('/api/news')
 @limiter.limit("30 per minute")
 def api_news():
@@ -488,7 +813,161 @@ def api_news():
         articles = fetch_multi_topic_news(topics, articles_per_topic)
         articles = articles[:num_articles]
     
-    return jsonify(articles)
+    fields, compact = news_shape_args()
+    return jsonify(shape_news_response(articles, fields, compact))
+
+def news_shape_args():
+    """?fields=id,title,... for a sparse fieldset, ?compact=1 for topic metadata by key"""
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+    compact = request.args.get('compact', 'false').lower() in ('1', 'true', 'yes')
+    return fields, compact
+
+def shape_ranked_results(articles, extra_fields):
+    """Project archive records like /api/news (same ?fields= and ?compact=), plus the route's ranking fields
+
+    Returns (shaped articles, topic metadata or None when not compact). Archive records also carry
+    internal fields such as image_source and archived_at, which are never sent.
+    """
+    fields, compact = news_shape_args()
+    shaped = shape_news_response(articles, fields, compact)
+    items = shaped['articles'] if compact else shaped
+    for item, article in zip(items, articles):
+        item.update({f: article[f] for f in extra_fields if f in article})
+    return items, (shaped['topics'] if compact else None)
+
+def sse_event(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+@app.route('/api/news/stream')
+@limiter.limit("30 per minute")
+def api_news_stream():
+    """Server-Sent Events version of /api/news: one 'articles' event per topic as soon as it is ready"""
+    topics = request.args.getlist('topics') or session.get('user_preferences', []) or ['inflation', 'economy']
+    num_articles = min(request.args.get('num_articles', 1, type=int), 50)
+    articles_per_topic = max(1, num_articles // len(topics)) if len(topics) > 1 else num_articles
+    fields, compact = news_shape_args()
+    
+    def generate():
+        # Tell the browser how long to wait before reconnecting after a dropped stream
+        yield "retry: 5000\n\n"
+        sent = 0
+        if MULTI_TOPIC_MODE == 'combined' and len(topics) > 1:
+            # One combined upstream call; topics are then emitted in request order
+            articles = fetch_multi_topic_news_combined(topics, articles_per_topic)
+            ready = ((topic, [a for a in articles if a.get('topic') == topic]) for topic in topics)
+        else:
+            futures = {news_executor.submit(fetch_news_by_topic, topic, articles_per_topic): topic for topic in topics}
+            ready = ((futures[f], f.result()) for f in as_completed(futures))
+        for topic, articles in ready:
+            if not articles:
+                continue
+            sent += len(articles)
+            payload = shape_news_response(articles, fields, compact)
+            yield sse_event('articles', payload if compact else {'topic': topic, 'articles': payload})
+        yield sse_event('done', {'count': sent})
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # don't let a reverse proxy buffer the stream
+    return response
+
+@app.route('/api/search')
+@limiter.limit("60 per minute")
+def api_search():
+    """Search articles the app has already fetched - no NewsAPI call, no authentication required"""
+    query = request.args.get('q', '').strip()
+    topic = request.args.get('topic')
+    limit = min(request.args.get('limit', 20, type=int), 50)
+    
+    if not query:
+        return jsonify({'error': 'Missing search query'}), 400
+    
+    started = time.perf_counter()
+    hits = search_index.search(query, limit=limit, topic=topic)
+    
+    results = []
+    for article_id, score in hits:
+        article = article_archive.get(article_id)
+        if article:
+            article['score'] = round(score, 4)
+            results.append(article)
+    with_engagement(results)
+    results, topics = shape_ranked_results(results, ('score',))
+    
+    payload = {
+        'query': query,
+        'results': results,
+        'took_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
+    if topics is not None:
+        payload['topics'] = topics
+    return jsonify(payload)
+
+@app.route('/api/articles/<article_id>/related')
+@limiter.limit("60 per minute")
+def api_related_articles(article_id):
+    """Articles similar to the given one, from the local vector index - no authentication required"""
+    limit = min(request.args.get('limit', 5, type=int), 20)
+    same_topic = request.args.get('same_topic', 'false').lower() == 'true'
+    
+    started = time.perf_counter()
+    related = []
+    for related_id, similarity in related_index.related(article_id, limit=limit, same_topic=same_topic):
+        article = article_archive.get(related_id)
+        if article:
+            article['similarity'] = round(similarity, 4)
+            related.append(article)
+    with_engagement(related)
+    related, topics = shape_ranked_results(related, ('similarity',))
+    
+    payload = {
+        'article_id': article_id,
+        'related': related,
+        'took_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
+    if topics is not None:
+        payload['topics'] = topics
+    return jsonify(payload)
+
+ARTICLE_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+def placeholder_svg(topic):
+    """The topic placeholder as raw SVG markup (TOPIC_CONFIGS stores it as a data URI)"""
+    config = TOPIC_CONFIGS.get(topic, TOPIC_CONFIGS['inflation'])
+    return unquote(config['placeholder'].split(',', 1)[1])
+
+@app.route('/img/<article_id>')
+def article_image(article_id):
+    """Resized, cached thumbnail of an article's publisher image, or the topic placeholder"""
+    article = article_archive.get(article_id) if ARTICLE_ID_RE.match(article_id) else None
+    topic = request.args.get('topic') or (article or {}).get('topic')
+    width = pick_width(request.args.get('w', 400, type=int))
+    image_format = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
+    
+    if article:
+        source = article.get('image_source')
+        if not source and str(article.get('image_url', '')).startswith(('http://', 'https://')):
+            source = article['image_url']  # archived before the proxy existed
+        try:
+            data = thumbnail_cache.get(article_id, source, width, image_format)
+            response = Response(data, mimetype=THUMBNAIL_FORMATS[image_format][1])
+            response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+            response.headers['Vary'] = 'Accept'
+            return response
+        except ImageProxyError as e:
+            print(f"DEBUG: Image proxy fallback for {article_id}: {str(e)}")
+    
+    response = Response(placeholder_svg(topic), mimetype='image/svg+xml')
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
+
+@app.route('/placeholder/<topic>.svg')
+def placeholder_image(topic):
+    """Topic placeholder image, referenced by URL instead of inlined into every article"""
+    response = Response(placeholder_svg(topic), mimetype='image/svg+xml')
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return response
 
 @app.route('/api/swipe', methods=['POST'])
 @require_auth
@@ -517,7 +996,7 @@ def api_swipe():
 @app.route('/api/article-engagement', methods=['POST'])
 @require_auth
 def api_article_engagement():
-    """API endpoint to handle article likes/dislikes"""
+    """API endpoint to handle article likes/dislikes, and views for the trending lists"""
     data = request.get_json()
     article_id = data.get('article_id')
     action = data.get('action')
@@ -525,6 +1004,14 @@ def api_article_engagement():
     
     if not article_id or not action:
         return jsonify({'error': 'Missing article_id or action'}), 400
+    if not isinstance(article_id, str) or not isinstance(action, str):
+        return jsonify({'error': 'article_id and action must be strings'}), 400
+    topic = data.get('topic') if isinstance(data.get('topic'), str) and data.get('topic') in TOPIC_CONFIGS else None
+    
+    if action == 'view':
+        # Views only feed the in-memory trending counters: one O(1) update, no articles.json rewrite
+        trending_tracker.record(article_id, topic or trending_topic(article_id), 'views')
+        return jsonify({'success': True})
     
     articles = load_articles()
     
@@ -549,12 +1036,58 @@ def api_article_engagement():
     
     save_articles(articles)
     
+    if action in ('like', 'dislike'):
+        if is_active:
+            trending_tracker.record(article_id, topic or trending_topic(article_id), action + 's')
+        else:
+            trending_tracker.undo(article_id, action + 's')
+    
     return jsonify({
         'success': True,
         'likes': articles[article_id]['likes'],
         'dislikes': articles[article_id]['dislikes']
     })
 
+def trending_topic(article_id):
+    """Topic of an article for the trending lists, from the archive"""
+    article = article_archive.get(article_id) if ARTICLE_ID_RE.match(article_id) else None
+    return article.get('topic') if article else None
+
+@app.route('/api/trending')
+@limiter.limit("60 per minute")
+def api_trending():
+    """Articles with the most recent engagement, per topic or overall - no authentication required
+
+    Reads the precomputed top-k list, so the cost does not grow with the archive.
+    """
+    topic = request.args.get('topic')
+    limit = min(request.args.get('limit', 10, type=int), trending_tracker.k)
+    if topic and topic not in TOPIC_CONFIGS:
+        return jsonify({'error': f'Unknown topic {topic}'}), 400
+    
+    started = time.perf_counter()
+    hits = trending_tracker.trending(topic, limit=limit)
+    rates = trending_tracker.rates([article_id for article_id, _ in hits])
+    results = []
+    for article_id, score in hits:
+        article = article_archive.get(article_id)
+        if article:
+            article['trending_score'] = round(score, 4)
+            article['recent'] = {event: round(value, 4) for event, value in rates.get(article_id, {}).items() if event != 'score'}
+            results.append(article)
+    with_engagement(results)
+    results, topics = shape_ranked_results(results, ('trending_score', 'recent'))
+    
+    payload = {
+        'topic': topic,
+        'half_life_hours': trending_tracker.half_life / 3600,
+        'results': results,
+        'took_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
+    if topics is not None:
+        payload['topics'] = topics
+    return jsonify(payload)
+
 @app.route('/api/topics')
 @require_auth
 def api_topics():
@@ -617,7 +1150,75 @@ def admin():
                          articles=articles,
                          total_users=total_users,
                          users_with_preferences=users_with_preferences,
-                         total_articles=total_articles)
+                         total_articles=total_articles,
+                         profiling=request_profiler.status(),
+                         profiles=request_profiler.summaries())
+
+@app.before_request
+def start_request_profile():
+    """Profile a sampled fraction of requests to the chosen endpoints while profiling is on"""
+    if not request_profiler.enabled:
+        return
+    g.request_profile = request_profiler.start(request.endpoint, request.path, request.method)
+
+@app.after_request
+def note_profiled_status(response):
+    if g.get('request_profile') is not None:
+        g.request_profile_status = response.status_code
+    return response
+
+@app.teardown_request
+def stop_request_profile(exc):
+    active = g.pop('request_profile', None)
+    if active is not None:
+        request_profiler.stop(active, status=g.pop('request_profile_status', 500 if exc else None))
+
+@app.route('/admin/profiling', methods=['POST'])
+def admin_profiling():
+    """Turn sampled profiling on or off and choose the endpoints and sample rate - admin only"""
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+    
+    endpoints = [e.strip() for e in request.form.get('endpoints', '').split(',') if e.strip()]
+    unknown = [e for e in endpoints if e not in app.view_functions]
+    if unknown:
+        flash(f"Unknown endpoints: {', '.join(unknown)}", 'error')
+        return redirect(url_for('admin'))
+    
+    request_profiler.configure(
+        enabled=request.form.get('enabled') == 'on',
+        sample_rate=request.form.get('sample_rate', request_profiler.sample_rate, type=float),
+        endpoints=endpoints or None,
+        capacity=request.form.get('capacity', type=int)
+    )
+    status = request_profiler.status()
+    state = 'on' if status['enabled'] else 'off'
+    flash(f"Profiling {state}: {status['sample_rate']:.0%} of {', '.join(status['endpoints'])}", 'success')
+    return redirect(url_for('admin'))
+
+@app.route('/admin/profiling/download.<fmt>')
+def admin_profiling_download(fmt):
+    """Download captured profiles, one by id or merged (optionally per endpoint) - admin only
+
+    fmt is 'pstats' (load with pstats.Stats or snakeviz) or 'collapsed' (flamegraph.pl, speedscope).
+    """
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin_login'))
+    if fmt not in ('pstats', 'collapsed'):
+        return jsonify({'error': f'Unknown profile format {fmt}'}), 404
+    
+    endpoint = request.args.get('endpoint')
+    records = request_profiler.select(profile_id=request.args.get('id', type=int), endpoint=endpoint)
+    if not records:
+        return jsonify({'error': 'No matching profiles captured'}), 404
+    
+    name = f"profile_{request.args.get('id') or endpoint or 'all'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    if fmt == 'pstats':
+        data, mimetype = request_profiler.pstats_bytes(records), 'application/octet-stream'
+    else:
+        data, mimetype = request_profiler.collapsed_stacks(records), 'text/plain'
+    return Response(data, mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{name}.{fmt}"'})
 
 @app.route('/admin/login', methods=['GET', 'POST'])
 def admin_login():
@@ -646,6 +1247,37 @@ def admin_logout():
     flash('Admin logged out successfully!', 'info')
     return redirect(url_for('admin_login'))
 
+def export_users_response(export_format):
+    """Stream the user export in the given format, honouring column and filter query args
+
+    Query args: columns (comma separated keys from user_export.EXPORT_COLUMNS),
+    preference, created_after, created_before (ISO dates) and q (text search).
+    """
+    stream, mimetype, extension = user_export.EXPORT_FORMATS[export_format]
+    columns = user_export.parse_columns(request.args.get('columns'))
+    predicate = user_export.build_filter(
+        preference=request.args.get('preference'),
+        created_after=request.args.get('created_after'),
+        created_before=request.args.get('created_before'),
+        search=request.args.get('q')
+    )
+    # Read both user stores before the response starts, so a failure is still a JSON 500
+    # rather than a truncated download; only the row formatting is streamed
+    users = list(user_export.iter_all_users(security_manager.load_users(), load_users_from_json()))
+    if not users:
+        return jsonify({'error': 'No user data available'}), 404
+    rows = user_export.iter_user_rows(users, columns, predicate)
+    
+    # Generate filename with timestamp
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"visual_news_users_{timestamp}.{extension}"
+    
+    return Response(
+        stream_with_context(stream(rows, user_export.column_headers(columns))),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
 @app.route('/admin/export/csv')
 def export_users_csv():
     """Export user data to CSV file - requires admin authentication"""
@@ -653,97 +1285,19 @@ def export_users_csv():
         return redirect(url_for('admin_login'))
     
     try:
-        # Load users data from both sources
-        users = load_all_users_for_admin()
-        
-        if not users:
-            return jsonify({'error': 'No user data available'}), 404
-        
-        # Prepare data for CSV
-        csv_data = []
-        for user_id, user_data in users.items():
-            csv_data.append({
-                'User ID': user_id,
-                'Name': user_data.get('name', 'N/A'),
-                'Phone': user_data.get('phone', 'N/A'),
-                'Email': user_data.get('email', 'N/A'),
-                'Created At': user_data.get('created_at', 'N/A'),
-                'Preferences': ', '.join(user_data.get('preferences', [])) if user_data.get('preferences') else 'None',
-                'Liked Topics Count': len(user_data.get('liked_topics', {})),
-                'Passed Topics Count': len(user_data.get('passed_topics', {})),
-                'Total Engagements': len(user_data.get('liked_topics', {})) + len(user_data.get('passed_topics', {}))
-            })
-        
-        # Create CSV content
-        import csv
-        output = io.StringIO()
-        fieldnames = ['User ID', 'Name', 'Phone', 'Email', 'Created At', 'Preferences', 'Liked Topics Count', 'Passed Topics Count', 'Total Engagements']
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(csv_data)
-        
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"visual_news_users_{timestamp}.csv"
-        
-        return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            as_attachment=True,
-            download_name=filename,
-            mimetype='text/csv'
-        )
-        
+        return export_users_response('csv')
     except Exception as e:
         print(f"Error exporting to CSV: {e}")
         return jsonify({'error': f'Failed to export data: {str(e)}'}), 500
 
 @app.route('/admin/export/excel')
 def export_users_excel():
-    """Export user data to Excel-compatible CSV file - requires admin authentication"""
+    """Export user data to an Excel .xlsx workbook - requires admin authentication"""
     if not session.get('admin_logged_in'):
         return redirect(url_for('admin_login'))
     
     try:
-        # Load users data from both sources
-        users = load_all_users_for_admin()
-        
-        if not users:
-            return jsonify({'error': 'No user data available'}), 404
-        
-        # Prepare data for Excel-compatible CSV
-        csv_data = []
-        for user_id, user_data in users.items():
-            csv_data.append({
-                'User ID': user_id,
-                'Name': user_data.get('name', 'N/A'),
-                'Phone': user_data.get('phone', 'N/A'),
-                'Email': user_data.get('email', 'N/A'),
-                'Created At': user_data.get('created_at', 'N/A'),
-                'Preferences': ', '.join(user_data.get('preferences', [])) if user_data.get('preferences') else 'None',
-                'Liked Topics Count': len(user_data.get('liked_topics', {})),
-                'Passed Topics Count': len(user_data.get('passed_topics', {})),
-                'Total Engagements': len(user_data.get('liked_topics', {})) + len(user_data.get('passed_topics', {}))
-            })
-        
-        # Create CSV content
-        import csv
-        output = io.StringIO()
-        fieldnames = ['User ID', 'Name', 'Phone', 'Email', 'Created At', 'Preferences', 'Liked Topics Count', 'Passed Topics Count', 'Total Engagements']
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(csv_data)
-        
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"visual_news_users_{timestamp}.csv"
-        
-        return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            as_attachment=True,
-            download_name=filename,
-            mimetype='text/csv'
-        )
-        
+        return export_users_response('xlsx')
     except Exception as e:
         print(f"Error exporting to Excel: {e}")
         return jsonify({'error': f'Failed to export data: {str(e)}'}), 500
@@ -755,6 +1309,12 @@ if __name__ == '__main__':
     port = int(os.getenv('PORT', 10000))  # Render uses port 10000
     debug = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'  # Disable debug in production
     
+    # Only the serving process restores/saves the snapshot and crawls: not scripts that import app
+    # (they would spend NewsAPI quota and overwrite the snapshot), nor the debug reloader's parent
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_warm_start()
+        start_scraper()
+    
     print(f"Starting server on {host}:{port}")
     print(f"Host binding: {host} (should be 0.0.0.0 for Render)")
     app.run(debug=debug, host=host, port=port)
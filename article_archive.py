@@ -0,0 +1,242 @@
+"""
+Append-only on-disk archive of normalized articles.
+
+Articles are stored as zlib-compressed JSON records in numbered segment
+files. A fixed-width index file maps article ID -> (segment, offset, length)
+plus topic and archive time, so the in-memory state is just that index;
+article bodies are read on demand through memory-mapped segments.
+
+Record layout in a segment:   <u32 payload length><zlib(json)>
+Index entry layout:           see INDEX_ENTRY below, one entry per article
+
+Several worker processes can share one archive directory. Writers take an
+exclusive lock on the index file, catch up on entries other processes
+appended, and take record offsets from the segment's size on disk rather
+than from their own file position. Readers pick up new index entries when
+the index file has grown, so articles archived by another worker are found.
+Without fcntl (Windows) only one process may write to an archive.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# id (12 bytes), segment, offset, length, archived_at (epoch seconds), topic (16 bytes)
+INDEX_ENTRY = struct.Struct('<12sIQIQ16s')
+RECORD_HEADER = struct.Struct('<I')
+
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+# Fields filled in when an article is served rather than article content: engagement lives in
+# articles.json and the quick-notes summary in summarizer.summary_cache
+VOLATILE_FIELDS = ('likes', 'dislikes', 'views', 'summary')
+
+
+class ArticleArchive:
+    def __init__(self, directory, segment_max_bytes=SEGMENT_MAX_BYTES):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.lock = threading.Lock()
+        self.index = {}          # article_id -> (segment, offset, length, archived_at, topic)
+        self.by_topic = {}       # topic -> [article_id, ...] in archive order
+        self.maps = {}           # segment -> (mmap, size mapped)
+        self.active_segment = 0
+        self.active_file = None
+        self.segment_end = 0     # size of the active segment on disk, valid while holding the file lock
+        self.index_path = os.path.join(self.directory, 'index.bin')
+        self.index_read = 0      # bytes of the index file already loaded
+        os.makedirs(self.directory, exist_ok=True)
+        self.index_file = open(self.index_path, 'ab')
+        with self.lock:
+            self._lock_file()
+            try:
+                self._refresh_index(truncate_torn=True)
+            finally:
+                self._unlock_file()
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"segment-{segment:05d}.dat")
+
+    def _lock_file(self):
+        if fcntl is not None:
+            fcntl.flock(self.index_file.fileno(), fcntl.LOCK_EX)
+
+    def _unlock_file(self):
+        if fcntl is not None:
+            fcntl.flock(self.index_file.fileno(), fcntl.LOCK_UN)
+
+    def _refresh_index(self, truncate_torn=False):
+        """Load index entries appended since the last read (by this or another process); caller holds self.lock
+
+        A torn trailing entry is skipped, and truncated when truncate_torn is set (only under the file lock).
+        """
+        size = os.path.getsize(self.index_path)
+        if size <= self.index_read:
+            return
+        with open(self.index_path, 'rb') as f:
+            f.seek(self.index_read)
+            data = f.read(size - self.index_read)
+        usable = len(data) - len(data) % INDEX_ENTRY.size
+        for start in range(0, usable, INDEX_ENTRY.size):
+            raw_id, segment, offset, length, archived_at, raw_topic = INDEX_ENTRY.unpack_from(data, start)
+            article_id = raw_id.rstrip(b'\0').decode('ascii')
+            topic = raw_topic.rstrip(b'\0').decode('ascii')
+            if article_id not in self.index:
+                self.index[article_id] = (segment, offset, length, archived_at, topic)
+                self.by_topic.setdefault(topic, []).append(article_id)
+            self.active_segment = max(self.active_segment, segment)
+        self.index_read += usable
+        if truncate_torn and usable != len(data):
+            os.truncate(self.index_path, self.index_read)
+
+    def _refreshed(self):
+        with self.lock:
+            self._refresh_index()
+
+    def _open_active_segment(self):
+        """Open the newest segment, rolling over when full; caller holds the file lock"""
+        path = self._segment_path(self.active_segment)
+        if self.active_file is None or self.active_file.name != path:
+            if self.active_file is not None:
+                self.active_file.close()
+            self.active_file = open(path, 'ab')
+            self.segment_end = os.fstat(self.active_file.fileno()).st_size
+        if self.segment_end >= self.segment_max_bytes:
+            self.active_file.close()
+            self.active_segment += 1
+            self.active_file = open(self._segment_path(self.active_segment), 'ab')
+            self.segment_end = os.fstat(self.active_file.fileno()).st_size
+        return self.active_file
+
+    def __contains__(self, article_id):
+        if article_id not in self.index:
+            self._refreshed()
+        return article_id in self.index
+
+    def __len__(self):
+        self._refreshed()
+        return len(self.index)
+
+    def add(self, article, topic=None):
+        """Append an article unless its ID is already archived; returns True if written"""
+        return self.add_many([article], topic) == 1
+
+    def add_many(self, articles, topic=None):
+        """Append every article whose ID is not archived yet, returning how many were written"""
+        written = 0
+        now = int(time.time())
+        with self.lock:
+            self._lock_file()
+            try:
+                # Another process may have archived some of these, or filled the active segment
+                self._refresh_index(truncate_torn=True)
+                if self.active_file is not None:
+                    self.segment_end = os.fstat(self.active_file.fileno()).st_size
+                entries = []
+                for article in articles:
+                    article_id = article.get('id')
+                    if not article_id or article_id in self.index:
+                        continue
+                    article_topic = (topic or article.get('topic') or '')[:16]
+                    record = {k: v for k, v in article.items() if k not in VOLATILE_FIELDS}
+                    payload = zlib.compress(json.dumps(record, separators=(',', ':')).encode('utf-8'))
+
+                    segment_file = self._open_active_segment()
+                    offset = self.segment_end
+                    segment_file.write(RECORD_HEADER.pack(len(payload)))
+                    segment_file.write(payload)
+                    self.segment_end += RECORD_HEADER.size + len(payload)
+
+                    entry = (self.active_segment, offset, RECORD_HEADER.size + len(payload), now, article_topic)
+                    self.index[article_id] = entry
+                    self.by_topic.setdefault(article_topic, []).append(article_id)
+                    entries.append(INDEX_ENTRY.pack(
+                        article_id.encode('ascii', 'ignore')[:12], entry[0], entry[1], entry[2], now,
+                        article_topic.encode('ascii', 'ignore')
+                    ))
+                    written += 1
+                if written:
+                    # Segment data must reach disk before the index entries that point at it
+                    self.active_file.flush()
+                    self.index_file.write(b''.join(entries))
+                    self.index_file.flush()
+                    self.index_read += len(entries) * INDEX_ENTRY.size
+            finally:
+                # Nothing may stay buffered past the lock, or it would land after another process's records
+                if self.active_file is not None:
+                    self.active_file.flush()
+                self._unlock_file()
+        return written
+
+    def _segment_map(self, segment, needed):
+        """Return an mmap of a segment covering at least `needed` bytes"""
+        cached = self.maps.get(segment)
+        if cached and cached[1] >= needed:
+            return cached[0]
+        if cached:
+            cached[0].close()
+        with open(self._segment_path(segment), 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.maps[segment] = (mapped, len(mapped))
+        return mapped
+
+    def get(self, article_id):
+        """Return the archived article dict, or None"""
+        with self.lock:
+            entry = self.index.get(article_id)
+            if entry is None:
+                # Possibly archived by another worker since we last looked
+                self._refresh_index()
+                entry = self.index.get(article_id)
+            if entry is None:
+                return None
+            segment, offset, length, archived_at, topic = entry
+            mapped = self._segment_map(segment, offset + length)
+            payload = mapped[offset + RECORD_HEADER.size:offset + length]
+        article = json.loads(zlib.decompress(payload))
+        article['archived_at'] = archived_at
+        return article
+
+    def archived_at(self, article_id):
+        """Return the epoch seconds an article was archived, or None"""
+        if article_id not in self.index:
+            self._refreshed()
+        entry = self.index.get(article_id)
+        return entry[3] if entry else None
+
+    def recent(self, topic, limit=10):
+        """Return up to `limit` of the most recently archived articles for a topic, newest first"""
+        self._refreshed()
+        ids = self.by_topic.get(topic, [])[-limit:] if limit else []
+        return [article for article in (self.get(i) for i in reversed(ids)) if article]
+
+    def iter_ids(self, since=None):
+        """Yield archived article IDs in archive order, optionally only those archived at or after `since`"""
+        self._refreshed()
+        for article_id, entry in list(self.index.items()):
+            if since is None or entry[3] >= since:
+                yield article_id
+
+    def close(self):
+        with self.lock:
+            for mapped, _ in self.maps.values():
+                mapped.close()
+            self.maps = {}
+            if self.active_file:
+                self.active_file.close()
+                self.active_file = None
+            if self.index_file:
+                self.index_file.close()
+                self.index_file = None
+
+
+# Global archive instance
+article_archive = ArticleArchive(os.getenv('ARTICLE_ARCHIVE_DIR', 'article_archive'))
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Compare per-topic and combined multi-topic NewsAPI fetching
+Needs a real NEWS_API_KEY; each run spends 1 + len(topics) NewsAPI requests
+
+Usage:
+    python bench_multi_topic.py
+    python bench_multi_topic.py --topics technology science health --per-topic 10
+"""
+
+import argparse
+import os
+import time
+
+# Use a private in-process topic cache so clearing it does not touch the workers' shared cache file
+os.environ.setdefault('TOPIC_CACHE_PATH', '')
+
+import app
+
+
+def run_mode(mode, topics, per_topic):
+    """Fetch with a cold cache and count upstream calls made"""
+    app.topic_cache.clear()
+    calls_before = app.quota_governor.allowed
+    started = time.perf_counter()
+    articles = app.fetch_multi_topic_news(topics, per_topic, mode=mode)
+    elapsed = time.perf_counter() - started
+    by_topic = {}
+    for article in articles:
+        by_topic.setdefault(article['topic'], set()).add(article['id'])
+    return elapsed, app.quota_governor.allowed - calls_before, by_topic
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark per-topic vs combined NewsAPI fetching")
+    parser.add_argument('--topics', nargs='+', default=list(app.TOPIC_CONFIGS))
+    parser.add_argument('--per-topic', type=int, default=5, help="articles kept per topic")
+    args = parser.parse_args(argv)
+
+    if app.news_api_key == "placeholder-key":
+        print("❌ NEWS_API_KEY is not set - nothing to benchmark")
+        return 1
+
+    results = {mode: run_mode(mode, args.topics, args.per_topic) for mode in ('per_topic', 'combined')}
+
+    print(f"\n{'mode':<10} {'seconds':>8} {'upstream calls':>15}")
+    for mode, (elapsed, calls, _) in results.items():
+        print(f"{mode:<10} {elapsed:>8.2f} {calls:>15}")
+
+    # Per-topic articles come from each topic's own query; combined ones were assigned by the
+    # classifier, so also check where each combined article appears in the per-topic results
+    per_topic_ids = results['per_topic'][2]
+    combined_ids = results['combined'][2]
+    print(f"\n{'topic':<12} {'per_topic':>9} {'combined':>9} {'overlap':>8} {'seen elsewhere':>15}")
+    all_per_topic = set().union(*per_topic_ids.values()) if per_topic_ids else set()
+    for topic in args.topics:
+        a = per_topic_ids.get(topic, set())
+        b = combined_ids.get(topic, set())
+        overlap = len(a & b) / len(a | b) if a | b else 0.0
+        elsewhere = len((b - a) & all_per_topic)
+        print(f"{topic:<12} {len(a):>9} {len(b):>9} {overlap:>8.0%} {elsewhere:>15}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
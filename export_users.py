@@ -1,66 +1,203 @@
 #!/usr/bin/env python3
 """
-Simple script to export user data from users.json to CSV format
+Export user data from both user stores (users.json and users_secure.json)
 Run this locally to get your user data immediately
+
+Usage:
+    python export_users.py                      # CSV with all columns
+    python export_users.py --format jsonl       # one JSON object per line
+    python export_users.py --format parquet     # needs pyarrow installed
+    python export_users.py --workers 4 --chunk-size 50000 --columns user_id,name,phone
 """
 
-import json
+import argparse
 import csv
-from datetime import datetime
+import io
+import json
 import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import chain, islice
 
-def export_users_to_csv():
-    """Export user data to CSV file"""
-    try:
-        # Load users data
-        if not os.path.exists('users.json'):
-            print("❌ users.json file not found!")
-            return
-        
+import user_export
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = None
+    parquet = None
+
+FILE_EXTENSIONS = {'csv': 'csv', 'jsonl': 'jsonl', 'parquet': 'parquet'}
+
+
+def load_user_stores(include_plain=True, include_secure=True):
+    """Return (secure_users, plain_users) from users_secure.json and users.json"""
+    secure_users = {}
+    if include_secure and os.path.exists('users_secure.json'):
+        from security import SecureUserManager
+        secure_users = SecureUserManager().load_users()
+
+    plain_users = {}
+    if include_plain and os.path.exists('users.json'):
         with open('users.json', 'r') as f:
-            users = json.load(f)
-        
-        if not users:
-            print("❌ No user data found!")
+            plain_users = json.load(f)
+    return secure_users, plain_users
+
+
+def iter_chunks(items, chunk_size):
+    """Group an iterable into lists of at most chunk_size items"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
             return
-        
-        # Prepare data for CSV
-        csv_data = []
-        for user_id, user_data in users.items():
-            csv_data.append({
-                'User ID': user_id,
-                'Name': user_data.get('name', 'N/A'),
-                'Phone': user_data.get('phone', 'N/A'),
-                'Email': user_data.get('email', 'N/A'),
-                'Created At': user_data.get('created_at', 'N/A'),
-                'Preferences': ', '.join(user_data.get('preferences', [])) if user_data.get('preferences') else 'None',
-                'Liked Topics Count': len(user_data.get('liked_topics', {})),
-                'Passed Topics Count': len(user_data.get('passed_topics', {})),
-                'Total Engagements': len(user_data.get('liked_topics', {})) + len(user_data.get('passed_topics', {}))
-            })
-        
-        # Create CSV file
+        yield chunk
+
+
+def serialize_chunk(job):
+    """Turn one chunk of users into output rows; runs inside worker processes"""
+    export_format, columns, chunk = job
+    rows = list(user_export.iter_user_rows(chunk, columns))
+    if export_format == 'parquet':
+        return len(rows), rows
+
+    buffer = io.StringIO()
+    if export_format == 'csv':
+        csv.writer(buffer).writerows(rows)
+    else:
+        for row in rows:
+            buffer.write(json.dumps(dict(zip(columns, row))))
+            buffer.write('\n')
+    return len(rows), buffer.getvalue().encode('utf-8')
+
+
+def bounded_map(executor, fn, jobs, window):
+    """Like executor.map, but only reads `window` jobs ahead, so chunks are not all queued up front
+
+    Results are yielded in job order.
+    """
+    pending = deque()
+    for job in jobs:
+        pending.append(executor.submit(fn, job))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class ParquetSink:
+    """Append row chunks to a Parquet file as separate row groups"""
+
+    def __init__(self, filename, columns):
+        self.columns = columns
+        self.schema = pyarrow.schema([(c, pyarrow.int64() if c in user_export.INTEGER_COLUMNS else pyarrow.string())
+                                      for c in columns])
+        self.writer = parquet.ParquetWriter(filename, self.schema)
+
+    def write(self, rows):
+        arrays = []
+        for i, field in enumerate(self.schema):
+            values = [row[i] for row in rows]
+            if field.type == pyarrow.string():
+                values = [str(value) for value in values]
+            arrays.append(pyarrow.array(values, field.type))
+        self.writer.write_table(pyarrow.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def export_users(export_format='csv', output=None, columns=None, chunk_size=10000, workers=None,
+                 include_plain=True, include_secure=True):
+    """Export users in streaming chunks, returning (filename, rows_written, seconds)"""
+    columns = columns or list(user_export.EXPORT_COLUMNS)
+    if export_format == 'parquet' and pyarrow is None:
+        raise RuntimeError("Parquet export needs pyarrow - pip install pyarrow, or use --format csv/jsonl")
+
+    if not output:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"visual_news_users_{timestamp}.csv"
-        
-        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['User ID', 'Name', 'Phone', 'Email', 'Created At', 'Preferences', 'Liked Topics Count', 'Passed Topics Count', 'Total Engagements']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(csv_data)
-        
-        print(f"✅ User data exported successfully to: {filename}")
-        print(f"📊 Total users exported: {len(csv_data)}")
-        
-        # Display summary
-        print("\n📋 User Summary:")
-        for i, user in enumerate(csv_data, 1):
-            print(f"{i}. {user['Name']} ({user['Phone']}) - {user['Preferences']}")
-            
+        output = f"visual_news_users_{timestamp}.{FILE_EXTENSIONS[export_format]}"
+
+    started = time.perf_counter()
+    total = 0
+    users = user_export.iter_all_users(*load_user_stores(include_plain, include_secure))
+    jobs = ((export_format, columns, chunk) for chunk in iter_chunks(users, chunk_size))
+
+    if export_format == 'parquet':
+        sink = ParquetSink(output, columns)
+    else:
+        sink = open(output, 'wb')
+        if export_format == 'csv':
+            header = io.StringIO()
+            csv.writer(header).writerow(user_export.column_headers(columns))
+            sink.write(header.getvalue().encode('utf-8'))
+
+    workers = workers or os.cpu_count() or 1
+    # A pool only pays for its startup and pickling when there are several CPUs and several chunks
+    first_jobs = list(islice(jobs, 2))
+    jobs = chain(first_jobs, jobs)
+
+    executor = None
+    try:
+        if workers == 1 or len(first_jobs) < 2:
+            results = map(serialize_chunk, jobs)
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            # Two chunks in flight per worker keeps every process busy without buffering the whole export
+            results = bounded_map(executor, serialize_chunk, jobs, 2 * workers)
+
+        for count, payload in results:
+            sink.write(payload)
+            total += count
+            elapsed = time.perf_counter() - started
+            print(f"   ... {total} rows ({total / elapsed:,.0f} rows/s)")
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+        sink.close()
+
+    return output, total, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export Visual News users")
+    parser.add_argument('--format', choices=sorted(FILE_EXTENSIONS), default='csv')
+    parser.add_argument('--output', help="output file (default: timestamped name)")
+    parser.add_argument('--columns', help="comma separated column keys: " + ','.join(user_export.EXPORT_COLUMNS))
+    parser.add_argument('--chunk-size', type=int, default=10000, help="users per chunk")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: CPU count; 1 = no pool)")
+    parser.add_argument('--plain-only', action='store_true', help="only read users.json")
+    parser.add_argument('--secure-only', action='store_true', help="only read users_secure.json")
+    args = parser.parse_args(argv)
+
+    try:
+        filename, total, elapsed = export_users(
+            export_format=args.format,
+            output=args.output,
+            columns=user_export.parse_columns(args.columns),
+            chunk_size=max(1, args.chunk_size),
+            workers=args.workers,
+            include_plain=not args.secure_only,
+            include_secure=not args.plain_only
+        )
     except Exception as e:
         print(f"❌ Error exporting data: {e}")
+        return 1
+
+    if not total:
+        print("❌ No user data found!")
+        return 1
+
+    print(f"✅ User data exported successfully to: {filename}")
+    print(f"📊 Total users exported: {total} in {elapsed:.2f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+    return 0
+
 
 if __name__ == "__main__":
     print("🚀 Visual News - User Data Export")
     print("=" * 40)
-    export_users_to_csv()
+    raise SystemExit(main())
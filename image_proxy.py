@@ -0,0 +1,267 @@
+"""
+Thumbnail proxy for article images.
+
+The original publisher image is fetched once (with a byte cap), validated
+by decoding it with Pillow and kept in the cache. Each fixed width and
+format (WebP or JPEG) is rendered from that copy the first time it is asked
+for. Thumbnails live in an on-disk cache bounded by total size and
+evicted least-recently-used first, so card images are served locally with
+long-lived cache headers instead of sending clients multi-megabyte originals.
+
+Source URLs come from NewsAPI and scraped pages, so they are untrusted:
+hosts that resolve to loopback, private, link-local or otherwise reserved
+addresses are refused, and every redirect hop is checked the same way. The
+connection is made to the exact address that was checked (with the original
+Host header and TLS server name), so a host whose DNS answer changes between
+the check and the connect cannot reach an internal address.
+"""
+import io
+import ipaddress
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urljoin, urlparse
+
+import certifi
+import urllib3
+from PIL import Image
+
+THUMBNAIL_WIDTHS = (200, 400, 800)
+MAX_SOURCE_BYTES = 8 * 1024 * 1024
+MAX_SOURCE_PIXELS = 40_000_000
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP'}
+FORMATS = {'webp': ('WEBP', 'image/webp'), 'jpeg': ('JPEG', 'image/jpeg')}
+# Remember failed sources for a while so dead images are not refetched on every card
+FAILURE_TTL_SECONDS = 3600
+MAX_REDIRECTS = 3
+
+Image.MAX_IMAGE_PIXELS = MAX_SOURCE_PIXELS
+
+
+class ImageProxyError(Exception):
+    pass
+
+
+def check_public_url(url):
+    """Return an address to connect to for url, raising ImageProxyError unless it is http(s) and
+    its host resolves only to public addresses"""
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise ImageProxyError('no source image')
+    try:
+        addresses = socket.getaddrinfo(parsed.hostname, parsed.port or (443 if parsed.scheme == 'https' else 80),
+                                       proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError):
+        raise ImageProxyError(f'cannot resolve {parsed.hostname}')
+    for address in addresses:
+        ip = ipaddress.ip_address(address[4][0].split('%')[0])
+        if not ip.is_global or ip.is_multicast:
+            raise ImageProxyError(f'refusing non-public address for {parsed.hostname}')
+    if not addresses:
+        raise ImageProxyError(f'cannot resolve {parsed.hostname}')
+    return addresses[0][4][0]
+
+
+def open_pinned(url, address, timeout):
+    """GET url over a connection to `address` (already checked), without following redirects
+
+    Returns a streaming urllib3 response; the caller must close() it.
+    """
+    parsed = urlparse(url)
+    port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+    if parsed.scheme == 'https':
+        # Certificate and SNI are checked against the hostname, not the pinned address
+        pool = urllib3.HTTPSConnectionPool(address, port, timeout=timeout, retries=False, maxsize=1,
+                                           cert_reqs='CERT_REQUIRED', ca_certs=certifi.where(),
+                                           server_hostname=parsed.hostname, assert_hostname=parsed.hostname)
+    else:
+        pool = urllib3.HTTPConnectionPool(address, port, timeout=timeout, retries=False, maxsize=1)
+    path = (parsed.path or '/') + (f'?{parsed.query}' if parsed.query else '')
+    headers = {'Host': parsed.netloc.rsplit('@', 1)[-1], 'User-Agent': 'VisualNewsImageProxy/1.0'}
+    try:
+        return pool.urlopen('GET', path, headers=headers, redirect=False, preload_content=False)
+    except urllib3.exceptions.HTTPError as e:
+        raise ImageProxyError(f'cannot fetch {parsed.hostname}: {e}')
+
+
+def pick_width(requested):
+    """Smallest fixed width that is at least the requested width"""
+    for width in THUMBNAIL_WIDTHS:
+        if requested <= width:
+            return width
+    return THUMBNAIL_WIDTHS[-1]
+
+
+class ThumbnailCache:
+    def __init__(self, directory, max_bytes=200 * 1024 * 1024, timeout=10):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()     # filename -> size, least recently used first
+        self.total_bytes = 0
+        self.fetch_locks = {}            # article id -> [lock, number of requests holding or waiting for it]
+        self.failures = {}               # article id -> time of failure
+        self._scan()
+
+    def _scan(self):
+        """Rebuild the LRU order from files already on disk (oldest mtime first)"""
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self.entries[name] = size
+            self.total_bytes += size
+
+    def _filename(self, article_id, width, image_format):
+        return f"{article_id}_{width}.{image_format}"
+
+    def _read(self, filename):
+        with self.lock:
+            if filename not in self.entries:
+                return None
+            self.entries.move_to_end(filename)
+        path = os.path.join(self.directory, filename)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            with self.lock:
+                self.total_bytes -= self.entries.pop(filename, 0)
+            return None
+
+    def _write(self, filename, data):
+        path = os.path.join(self.directory, filename)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.total_bytes += len(data) - self.entries.pop(filename, 0)
+            self.entries[filename] = len(data)
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                oldest, size = self.entries.popitem(last=False)
+                self.total_bytes -= size
+                try:
+                    os.remove(os.path.join(self.directory, oldest))
+                except OSError:
+                    pass
+
+    def fetch_source(self, url):
+        """Download the original image, refusing anything over MAX_SOURCE_BYTES or on a non-public host
+
+        Redirects are followed by hand so every hop is checked.
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            address = check_public_url(url)
+            response = open_pinned(url, address, self.timeout)
+            try:
+                if response.status in (301, 302, 303, 307, 308) and response.headers.get('Location'):
+                    url = urljoin(url, response.headers['Location'])
+                    continue
+                if response.status >= 400:
+                    raise ImageProxyError(f'source returned HTTP {response.status}')
+                if int(response.headers.get('Content-Length') or 0) > MAX_SOURCE_BYTES:
+                    raise ImageProxyError('image too large')
+                data = bytearray()
+                for chunk in response.stream(64 * 1024):
+                    data.extend(chunk)
+                    if len(data) > MAX_SOURCE_BYTES:
+                        raise ImageProxyError('image too large')
+            finally:
+                response.close()
+            return bytes(data)
+        raise ImageProxyError('too many redirects')
+
+    def open_source(self, source):
+        """Decode and validate a source image, returning it as an RGB Pillow image"""
+        try:
+            with Image.open(io.BytesIO(source)) as probe:
+                if probe.format not in ALLOWED_FORMATS:
+                    raise ImageProxyError(f'unsupported image format {probe.format}')
+                probe.verify()
+            image = Image.open(io.BytesIO(source))
+            image.seek(0)
+            return image.convert('RGB')
+        except ImageProxyError:
+            raise
+        except Exception as e:
+            raise ImageProxyError(f'invalid image: {e}')
+
+    def render_thumbnail(self, source, width, image_format):
+        """Encode one width/format of a source image"""
+        image = self.open_source(source)
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, FORMATS[image_format][0], quality=80)
+        return out.getvalue()
+
+    def get(self, article_id, source_url, width, image_format):
+        """Return thumbnail bytes, rendering just this width/format on first use
+
+        The source is downloaded once and cached, so other widths and formats
+        are rendered from the local copy. Raises ImageProxyError if the image
+        cannot be produced.
+        """
+        filename = self._filename(article_id, width, image_format)
+        data = self._read(filename)
+        if data is not None:
+            return data
+
+        failed_at = self.failures.get(article_id)
+        if failed_at and time.time() - failed_at < FAILURE_TTL_SECONDS:
+            raise ImageProxyError('source failed recently')
+        if not source_url or not source_url.startswith(('http://', 'https://')):
+            raise ImageProxyError('no source image')
+
+        # One download per article even when several widths are requested at once; the lock
+        # stays registered while anyone holds or waits for it
+        with self.lock:
+            holder = self.fetch_locks.setdefault(article_id, [threading.Lock(), 0])
+            holder[1] += 1
+        try:
+            with holder[0]:
+                data = self._read(filename)
+                if data is not None:
+                    return data
+                # A request that held the lock before us may just have failed
+                failed_at = self.failures.get(article_id)
+                if failed_at and time.time() - failed_at < FAILURE_TTL_SECONDS:
+                    raise ImageProxyError('source failed recently')
+                try:
+                    source_name = f"{article_id}.source"
+                    source = self._read(source_name)
+                    if source is None:
+                        source = self.fetch_source(source_url)
+                        self.open_source(source)
+                        self._write(source_name, source)
+                    data = self.render_thumbnail(source, width, image_format)
+                    self._write(filename, data)
+                except Exception as e:
+                    now = time.time()
+                    if len(self.failures) > 10000:
+                        self.failures = {k: t for k, t in self.failures.items() if now - t < FAILURE_TTL_SECONDS}
+                    self.failures[article_id] = now
+                    raise ImageProxyError(str(e))
+        finally:
+            with self.lock:
+                holder[1] -= 1
+                if holder[1] == 0:
+                    self.fetch_locks.pop(article_id, None)
+        return data
+
+
+# Global thumbnail cache instance
+thumbnail_cache = ThumbnailCache(
+    os.getenv('IMAGE_CACHE_DIR', 'image_cache'),
+    max_bytes=int(os.getenv('IMAGE_CACHE_MAX_MB', 200)) * 1024 * 1024
+)
@@ -0,0 +1,359 @@
+"""
+Concurrent scraper for extra news sources.
+
+Replaces the one-browser-one-page Selenium flow from the web scraping
+notebook with plain HTTP: listing pages are fetched, same-site article
+links are followed, and each article page is parsed for its OpenGraph /
+meta tags. Output is NewsAPI-shaped article dicts (title, description,
+url, urlToImage, publishedAt, source) so app.py can run them through the
+same normalize_article pipeline as NewsAPI results.
+
+- asyncio drives the crawl; each fetch runs `requests` in a worker thread
+- a semaphore per host caps concurrency and a per-host delay keeps it polite
+- ETag / Last-Modified are remembered per URL and sent back as conditional
+  GET headers, so unchanged pages cost a 304 and are skipped
+- HTML is parsed incrementally from the response stream and the download
+  stops once the metadata has been seen (usually at </head>)
+"""
+import asyncio
+import codecs
+import json
+import os
+import re
+import threading
+import time
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse, urldefrag
+
+import requests
+
+USER_AGENT = "VisualNewsBot/1.0 (+https://github.com/UdayAnalyst/visual-news)"
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+READ_CHUNK_BYTES = 16 * 1024
+
+# Article-looking paths: a dated path, a long slug or a numeric id
+ARTICLE_PATH_RE = re.compile(r"/(19|20)\d\d/|/[a-z0-9]+(?:-[a-z0-9]+){3,}|/\d{5,}")
+
+
+class PageParser(HTMLParser):
+    """Incremental HTML parser collecting page metadata and links"""
+
+    def __init__(self, collect_links=True):
+        super().__init__(convert_charrefs=True)
+        self.collect_links = collect_links
+        self.meta = {}
+        self.links = []
+        self.title_parts = []
+        self.in_title = False
+        self.head_done = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'meta':
+            key = (attrs.get('property') or attrs.get('name') or attrs.get('itemprop') or '').lower()
+            if key and attrs.get('content') and key not in self.meta:
+                self.meta[key] = attrs['content'].strip()
+        elif tag == 'title':
+            self.in_title = True
+        elif tag == 'a' and self.collect_links and attrs.get('href'):
+            self.links.append(attrs['href'])
+        elif tag == 'body':
+            self.head_done = True
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self.in_title = False
+        elif tag == 'head':
+            self.head_done = True
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title_parts.append(data)
+
+    @property
+    def title(self):
+        return ' '.join(''.join(self.title_parts).split())
+
+
+def extract_article(url, parser, source_name):
+    """Build a NewsAPI-shaped article dict from parsed page metadata, or None"""
+    meta = parser.meta
+    title = meta.get('og:title') or meta.get('twitter:title') or parser.title
+    if not title:
+        return None
+    return {
+        'title': title,
+        'description': meta.get('og:description') or meta.get('description') or meta.get('twitter:description') or '',
+        'url': meta.get('og:url') or url,
+        'urlToImage': urljoin(url, meta['og:image']) if meta.get('og:image') else None,
+        'publishedAt': meta.get('article:published_time') or meta.get('datepublished') or meta.get('date') or '',
+        'source': {'name': meta.get('og:site_name') or source_name},
+    }
+
+
+class Crawler:
+    def __init__(self, per_host_concurrency=2, politeness_delay=1.0, timeout=10,
+                 max_articles_per_seed=20, validators_file=None, user_agent=USER_AGENT):
+        self.per_host_concurrency = per_host_concurrency
+        self.politeness_delay = politeness_delay
+        self.timeout = timeout
+        self.max_articles_per_seed = max_articles_per_seed
+        self.validators_file = validators_file
+        self.user_agent = user_agent
+        self.validators = self._load_validators()
+        self.validators_lock = threading.Lock()
+        self.local = threading.local()
+        self.stats = {}
+
+    def _load_validators(self):
+        if self.validators_file and os.path.exists(self.validators_file):
+            try:
+                with open(self.validators_file, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"ERROR: Failed to load scraper validators: {str(e)}")
+        return {}
+
+    def save_validators(self):
+        if not self.validators_file:
+            return
+        with self.validators_lock:
+            data = dict(self.validators)
+        tmp_path = self.validators_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.validators_file)
+
+    def _session(self):
+        # requests.Session is not thread safe, so each worker thread gets its own
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+            session.headers['User-Agent'] = self.user_agent
+        return session
+
+    def fetch_page(self, url, collect_links, conditional=True):
+        """Fetch and incrementally parse a page; returns (status, parser or None, bytes read). Runs in a worker thread"""
+        headers = {}
+        validators = self.validators.get(url) if conditional else None
+        if validators:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+
+        with self._session().get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304:
+                return 304, None, 0
+            response.raise_for_status()
+            if 'html' not in response.headers.get('Content-Type', 'text/html'):
+                return response.status_code, None, 0
+
+            new_validators = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }
+            if any(new_validators.values()):
+                with self.validators_lock:
+                    self.validators[url] = new_validators
+
+            parser = PageParser(collect_links=collect_links)
+            # requests assumes ISO-8859-1 when no charset is declared; HTML today is almost always UTF-8
+            content_type = response.headers.get('Content-Type', '')
+            encoding = response.encoding if 'charset' in content_type.lower() else 'utf-8'
+            try:
+                decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+            except LookupError:
+                decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            received = 0
+            for chunk in response.iter_content(READ_CHUNK_BYTES):
+                received += len(chunk)
+                parser.feed(decoder.decode(chunk))
+                # Article pages only need the <head>; listing pages are read for links
+                if (not collect_links and parser.head_done) or received >= MAX_PAGE_BYTES:
+                    break
+            return response.status_code, parser, received
+
+    async def _fetch(self, url, collect_links, conditional=True):
+        """Fetch one URL respecting the per-host concurrency limit and politeness delay"""
+        host = urlparse(url).netloc
+        semaphore = self.host_semaphores.setdefault(host, asyncio.Semaphore(self.per_host_concurrency))
+        async with semaphore:
+            lock = self.host_locks.setdefault(host, asyncio.Lock())
+            async with lock:
+                wait = self.host_next_request.get(host, 0) - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self.host_next_request[host] = time.monotonic() + self.politeness_delay
+            try:
+                status, parser, received = await asyncio.to_thread(self.fetch_page, url, collect_links, conditional)
+            except Exception as e:
+                print(f"ERROR: Failed to scrape {url}: {str(e)}")
+                self.stats['errors'] += 1
+                return None
+            self.stats['pages'] += 1
+            self.stats['bytes'] += received
+            if status == 304:
+                self.stats['not_modified'] += 1
+            return parser
+
+    def article_links(self, seed_url, parser):
+        """Same-host links on a listing page that look like articles, in page order"""
+        host = urlparse(seed_url).netloc
+        seen = set()
+        links = []
+        for href in parser.links:
+            url = urldefrag(urljoin(seed_url, href))[0]
+            parsed = urlparse(url)
+            if parsed.scheme not in ('http', 'https') or parsed.netloc != host or url in seen:
+                continue
+            if ARTICLE_PATH_RE.search(parsed.path):
+                seen.add(url)
+                links.append(url)
+        return links[:self.max_articles_per_seed]
+
+    async def _crawl_seed(self, seed_url):
+        # Listing pages are always re-read in full: their links are what changes
+        listing = await self._fetch(seed_url, collect_links=True, conditional=False)
+        if listing is None:
+            return []
+        source_name = listing.meta.get('og:site_name') or urlparse(seed_url).netloc
+        links = self.article_links(seed_url, listing)
+        pages = await asyncio.gather(*(self._fetch(url, collect_links=False) for url in links))
+        articles = []
+        for url, parser in zip(links, pages):
+            article = extract_article(url, parser, source_name) if parser else None
+            if article:
+                articles.append(article)
+        return articles
+
+    async def crawl_async(self, seed_urls):
+        self.host_semaphores = {}
+        self.host_locks = {}
+        self.host_next_request = {}
+        self.stats = {'pages': 0, 'not_modified': 0, 'errors': 0, 'bytes': 0}
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self._crawl_seed(url) for url in seed_urls))
+        elapsed = time.perf_counter() - started
+        self.stats['seconds'] = elapsed
+        self.stats['pages_per_second'] = self.stats['pages'] / elapsed if elapsed else 0.0
+        articles = [article for seed_articles in results for article in seed_articles]
+        self.stats['articles'] = len(articles)
+        return articles
+
+    def crawl(self, seed_urls):
+        """Crawl listing pages and the articles they link to; returns NewsAPI-shaped article dicts"""
+        articles = asyncio.run(self.crawl_async(seed_urls))
+        self.save_validators()
+        return articles
+
+
+def load_sources():
+    """Topic -> listing page URLs, from the SCRAPER_SOURCES env var (JSON)"""
+    raw = os.getenv('SCRAPER_SOURCES', '')
+    if not raw:
+        return {}
+    try:
+        sources = json.loads(raw)
+        return {topic: list(urls) for topic, urls in sources.items() if urls}
+    except Exception as e:
+        print(f"ERROR: Invalid SCRAPER_SOURCES: {str(e)}")
+        return {}
+
+
+def _check(articles=6, per_host_concurrency=2, body_bytes=512 * 1024):
+    """Crawl a local http.server fixture twice: per-host cap, early stop at </head>, then all 304s"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    paths = [f"/2024/05/fixture-story-number-{i}" for i in range(articles)]
+    state = {'active': 0, 'max_active': 0, 'not_modified': 0}
+    state_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            with state_lock:
+                state['active'] += 1
+                state['max_active'] = max(state['max_active'], state['active'])
+            try:
+                self._respond()
+            except (BrokenPipeError, ConnectionResetError):
+                pass    # the crawler hung up after </head>, which is the point
+            finally:
+                with state_lock:
+                    state['active'] -= 1
+
+        def _respond(self):
+            if self.path == '/':
+                links = ''.join(f'<a href="{path}">story</a>' for path in paths)
+                self._send(200, f"<html><head><title>Fixture</title></head><body>{links}</body></html>")
+                return
+            if self.path not in paths:
+                self._send(404, '')
+                return
+            time.sleep(0.1)     # keep requests overlapping so the cap is exercised
+            etag = f'"{self.path.rsplit("-", 1)[1]}"'
+            if self.headers.get('If-None-Match') == etag:
+                with state_lock:
+                    state['not_modified'] += 1
+                self._send(304, '', etag)
+                return
+            head = (f'<html><head><meta property="og:title" content="Story {etag}">'
+                    f'<meta property="og:site_name" content="Fixture"></head><body>')
+            self._send(200, head + 'x' * body_bytes + '</body></html>', etag)
+
+        def _send(self, status, body, etag=None):
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            if etag:
+                self.send_header('ETag', etag)
+            if status != 304:
+                self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            if status != 304:
+                for start in range(0, len(data), READ_CHUNK_BYTES):
+                    self.wfile.write(data[start:start + READ_CHUNK_BYTES])
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    seed = f"http://127.0.0.1:{server.server_address[1]}/"
+    crawler = Crawler(per_host_concurrency=per_host_concurrency, politeness_delay=0)
+    try:
+        first = crawler.crawl([seed])
+        first_stats = dict(crawler.stats)
+        second = crawler.crawl([seed])
+        second_stats = dict(crawler.stats)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    checks = {
+        f"{articles} articles found": len(first) == articles,
+        f"at most {per_host_concurrency} requests in flight per host (saw {state['max_active']})":
+            state['max_active'] <= per_host_concurrency,
+        f"article downloads stop at </head> ({first_stats['bytes']} bytes read)":
+            first_stats['bytes'] < articles * body_bytes // 4,
+        f"second crawl gets 304 for every article ({second_stats['not_modified']})":
+            second_stats['not_modified'] == articles == state['not_modified'] and not second,
+    }
+    for name, ok in checks.items():
+        print(f"{'✅' if ok else '❌'} {name}")
+    return all(checks.values())
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) < 2:
+        # No seed URLs: run the self-check against a local fixture site
+        sys.exit(0 if _check() else 1)
+    crawler = Crawler(politeness_delay=float(os.getenv('SCRAPER_DELAY', 1.0)))
+    found = crawler.crawl(sys.argv[1:])
+    for article in found:
+        print(f"• {article['title']} - {article['url']}")
+    stats = crawler.stats
+    print(f"📊 {stats['pages']} pages ({stats['not_modified']} not modified, {stats['errors']} errors), "
+          f"{stats['articles']} articles in {stats['seconds']:.2f}s - {stats['pages_per_second']:.1f} pages/s")
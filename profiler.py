@@ -0,0 +1,174 @@
+"""
+Sampled request profiling, switched on at runtime from the admin page.
+
+When enabled, a configurable fraction of requests to chosen endpoints run
+under cProfile, while a background thread samples the request thread's
+Python stack every few milliseconds. Each finished profile is kept in a
+bounded ring. It can be downloaded on its own or merged per endpoint,
+either as a pstats file (for pstats / snakeviz) or as collapsed stacks
+(for flamegraph.pl / speedscope).
+
+While profiling is off, the per-request cost is one attribute check.
+
+Only the request thread is profiled and sampled. Endpoints that hand their
+work to a thread pool (api_news_stream runs its fetches on news_executor)
+only show the request thread waiting, so they are not profiled by default.
+"""
+import cProfile
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+DEFAULT_ENDPOINTS = ('api_news', 'login')
+
+
+class ActiveProfile:
+    def __init__(self, endpoint, path, method):
+        self.endpoint = endpoint
+        self.path = path
+        self.method = method
+        self.thread_id = threading.get_ident()
+        self.profile = cProfile.Profile()
+        self.stacks = Counter()
+        self.stacks_lock = threading.Lock()
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+
+
+class RequestProfiler:
+    def __init__(self, capacity=20, sample_interval=0.005):
+        self.enabled = False
+        self.sample_rate = 0.1
+        self.endpoints = frozenset(DEFAULT_ENDPOINTS)
+        self.sample_interval = sample_interval
+        self.profiles = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        # cProfile can only run one profile at a time on newer Pythons; extra samples are skipped
+        self.busy = threading.Lock()
+        self.current = None
+        self.sampler = None
+        self.next_id = 1
+
+    def configure(self, enabled, sample_rate=None, endpoints=None, capacity=None):
+        with self.lock:
+            if sample_rate is not None:
+                self.sample_rate = min(max(float(sample_rate), 0.0), 1.0)
+            if endpoints is not None:
+                self.endpoints = frozenset(endpoints)
+            if capacity is not None and capacity != self.profiles.maxlen:
+                self.profiles = deque(self.profiles, maxlen=max(1, int(capacity)))
+            self.enabled = bool(enabled)
+            if self.enabled and (self.sampler is None or not self.sampler.is_alive()):
+                self.sampler = threading.Thread(target=self._sample_stacks, name='profiler-sampler', daemon=True)
+                self.sampler.start()
+
+    def status(self):
+        with self.lock:
+            return {
+                'enabled': self.enabled,
+                'sample_rate': self.sample_rate,
+                'endpoints': sorted(self.endpoints),
+                'capacity': self.profiles.maxlen,
+                'profiles': len(self.profiles),
+            }
+
+    def start(self, endpoint, path, method):
+        """Begin profiling the current request if it is sampled; returns an ActiveProfile or None"""
+        if endpoint not in self.endpoints or random.random() >= self.sample_rate:
+            return None
+        if not self.busy.acquire(blocking=False):
+            return None
+        try:
+            active = ActiveProfile(endpoint, path, method)
+            # Fails if another profiler (e.g. a debugger or coverage run) is already active
+            active.profile.enable()
+        except Exception as e:
+            self.busy.release()
+            print(f"ERROR: Could not start request profile: {str(e)}")
+            return None
+        self.current = active
+        return active
+
+    def stop(self, active, status=None):
+        active.profile.disable()
+        seconds = time.perf_counter() - active.started
+        self.current = None
+        self.busy.release()
+        with active.stacks_lock:
+            stacks = Counter(active.stacks)
+
+        active.profile.create_stats()
+        stats = active.profile.stats
+        with self.lock:
+            record = {
+                'id': self.next_id,
+                'endpoint': active.endpoint,
+                'path': active.path,
+                'method': active.method,
+                'status': status,
+                'started_at': active.started_at,
+                'seconds': seconds,
+                'samples': sum(stacks.values()),
+                'stats': stats,
+                'stacks': stacks,
+            }
+            self.next_id += 1
+            self.profiles.append(record)
+        return record
+
+    def _sample_stacks(self):
+        """Background sampler: record the profiled request thread's stack, root first"""
+        while self.enabled:
+            time.sleep(self.sample_interval)
+            active = self.current
+            if active is None:
+                continue
+            frame = sys._current_frames().get(active.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                with active.stacks_lock:
+                    active.stacks[';'.join(reversed(stack))] += 1
+
+    def summaries(self):
+        """Captured profiles without their payloads, newest first"""
+        with self.lock:
+            records = list(self.profiles)
+        return [{key: value for key, value in record.items() if key not in ('stats', 'stacks')}
+                for record in reversed(records)]
+
+    def select(self, profile_id=None, endpoint=None):
+        with self.lock:
+            records = list(self.profiles)
+        if profile_id is not None:
+            return [record for record in records if record['id'] == profile_id]
+        if endpoint:
+            return [record for record in records if record['endpoint'] == endpoint]
+        return records
+
+    def pstats_bytes(self, records):
+        """Merge profiles into one pstats file (what pstats.Stats.dump_stats would write)"""
+        merged = {}
+        for record in records:
+            for func, stat in record['stats'].items():
+                merged[func] = pstats.add_func_stats(merged.get(func, (0, 0, 0, 0, {})), stat)
+        return marshal.dumps(merged)
+
+    def collapsed_stacks(self, records):
+        """Merge sampled stacks into collapsed-stack text: 'frame;frame;frame count' per line"""
+        merged = Counter()
+        for record in records:
+            merged.update(record['stacks'])
+        return ''.join(f"{stack} {count}\n" for stack, count in merged.most_common())
+
+
+# Global profiler instance
+request_profiler = RequestProfiler(capacity=int(os.getenv('PROFILE_RING_SIZE', 20)))
@@ -0,0 +1,201 @@
+"""
+Related-article lookup over a local vector index.
+
+Each article is turned into a feature-hashed term-frequency vector and
+stored as a row of one contiguous float32 matrix. The matrix grows by
+doubling up to `capacity` rows and is then reused as a ring, so the index
+holds at most `capacity` recent articles. IDF weights come from
+per-bucket document frequencies and are applied at query time. Candidate
+neighbours are found with random-projection LSH tables and re-ranked by
+exact cosine similarity; small indexes are simply scanned in full.
+
+LSH keys are computed from the unweighted vectors, so a row's buckets do
+not depend on the IDF at the time it was added. Each query also probes
+the buckets one bit away from its own key in every table (multi-probe),
+which finds neighbours whose key differs in a single bit. Run
+`python related_index.py` to check recall and latency.
+"""
+import os
+import threading
+import zlib
+
+import numpy as np
+
+from search_index import tokenize
+
+DIMENSIONS = 2 ** 11
+LSH_TABLES = 16
+LSH_BITS = 12
+# Below this many articles an exact scan is as cheap as probing the LSH tables
+BRUTE_FORCE_LIMIT = 200
+
+
+def _hash(term):
+    # crc32 rather than hash(): stable across processes and restarts
+    return zlib.crc32(term.encode('utf-8'))
+
+
+class RelatedIndex:
+    def __init__(self, capacity=10000, dimensions=DIMENSIONS, tables=LSH_TABLES, bits=LSH_BITS, seed=42):
+        self.capacity = capacity
+        self.dimensions = dimensions
+        self.lock = threading.Lock()
+        self.vectors = np.zeros((min(capacity, 1024), dimensions), dtype=np.float32)
+        self.doc_freq = np.zeros(dimensions, dtype=np.float32)
+        self.ids = [None] * capacity
+        self.topics = [None] * capacity
+        self.slots = {}                 # article id -> row
+        self.count = 0                  # total articles ever added; next row is count % capacity
+        self.planes = np.random.default_rng(seed).standard_normal((tables, bits, dimensions)).astype(np.float32)
+        self.powers = (1 << np.arange(bits)).astype(np.int64)
+        self.probe_masks = [0] + [1 << bit for bit in range(bits)]
+        self.tables = [{} for _ in range(tables)]
+        self.row_keys = [None] * capacity
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, article_id):
+        return article_id in self.slots
+
+    def vectorize(self, text):
+        """Log-scaled hashed term frequencies for a piece of text"""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        terms = tokenize(text)
+        if terms:
+            buckets = np.fromiter((_hash(t) for t in terms), dtype=np.int64, count=len(terms)) % self.dimensions
+            np.add.at(vector, buckets, 1.0)
+            np.log1p(vector, out=vector)
+        return vector
+
+    def _idf(self):
+        n = max(len(self.slots), 1)
+        return np.log((1 + n) / (1 + self.doc_freq)).astype(np.float32) + 1
+
+    def _lsh_keys(self, vector):
+        projections = self.planes @ vector             # (tables, bits)
+        return ((projections > 0) @ self.powers).tolist()
+
+    def add(self, article_id, text, topic=None):
+        """Index an article; returns False if it was already indexed"""
+        vector = self.vectorize(text)
+        with self.lock:
+            if article_id in self.slots:
+                return False
+            row = self.count % self.capacity
+            if row >= len(self.vectors):
+                grown = np.zeros((min(self.capacity, 2 * len(self.vectors)), self.dimensions), dtype=np.float32)
+                grown[:len(self.vectors)] = self.vectors
+                self.vectors = grown
+            if self.ids[row] is not None:
+                self._remove_row(row)
+
+            self.vectors[row] = vector
+            self.doc_freq += vector > 0
+            self.ids[row] = article_id
+            self.topics[row] = topic
+            self.slots[article_id] = row
+            keys = self._lsh_keys(vector)
+            for table, key in zip(self.tables, keys):
+                table.setdefault(key, set()).add(row)
+            self.row_keys[row] = keys
+            self.count += 1
+        return True
+
+    def add_articles(self, articles):
+        """Index normalized article dicts, returning how many were new"""
+        return sum(
+            1 for a in articles
+            if a.get('id') and self.add(a['id'], f"{a.get('title', '')} {a.get('description', '')}", a.get('topic'))
+        )
+
+    def _remove_row(self, row):
+        self.doc_freq -= self.vectors[row] > 0
+        for table, key in zip(self.tables, self.row_keys[row]):
+            bucket = table.get(key)
+            if bucket:
+                bucket.discard(row)
+                if not bucket:
+                    del table[key]
+        del self.slots[self.ids[row]]
+        self.ids[row] = None
+        self.topics[row] = None
+        self.row_keys[row] = None
+        self.vectors[row] = 0
+
+    def related(self, article_id, limit=5, same_topic=False):
+        """Return [(article_id, similarity), ...] most similar first, excluding the article itself"""
+        with self.lock:
+            row = self.slots.get(article_id)
+            if row is None:
+                return []
+            idf = self._idf()
+            query = self.vectors[row] * idf
+            query_norm = np.linalg.norm(query)
+            if not query_norm:
+                return []
+
+            if len(self.slots) <= BRUTE_FORCE_LIMIT:
+                candidates = np.array([r for r in self.slots.values() if r != row], dtype=np.int64)
+            else:
+                found = set()
+                for table, key in zip(self.tables, self.row_keys[row]):
+                    for mask in self.probe_masks:
+                        bucket = table.get(key ^ mask)
+                        if bucket:
+                            found.update(bucket)
+                found.discard(row)
+                candidates = np.fromiter(found, dtype=np.int64, count=len(found))
+            if same_topic:
+                topic = self.topics[row]
+                candidates = candidates[[self.topics[r] == topic for r in candidates]] if len(candidates) else candidates
+            if not len(candidates):
+                return []
+
+            # |v * idf| as (v * v) @ idf^2, so only one copy of the candidate rows is made
+            rows = self.vectors[candidates]
+            norms = np.sqrt((rows * rows) @ (idf * idf))
+            norms[norms == 0] = 1
+            scores = (rows @ (query * idf)) / (norms * query_norm)
+            top = np.argsort(-scores)[:limit]
+            return [(self.ids[candidates[i]], float(scores[i])) for i in top if scores[i] > 0]
+
+
+# Global related-article index instance
+related_index = RelatedIndex(capacity=int(os.getenv('RELATED_INDEX_CAPACITY', 10000)))
+
+
+def _check(n, duplicate_share=0.7, queries=200, seed=1):
+    """Recall@5 of a near-duplicate (sharing duplicate_share of its terms) and ms per query at n articles"""
+    import random
+    import time
+
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}x" for i in range(20000)]
+    weights = [1 / (i + 1) for i in range(len(vocabulary))]
+
+    def document():
+        return list(dict.fromkeys(rng.choices(vocabulary, weights, k=40)))[:25]
+
+    index = RelatedIndex(capacity=n)
+    pairs = []
+    for i in range(n // 2):
+        terms = document()
+        keep = int(len(terms) * duplicate_share)
+        duplicate = rng.sample(terms, keep) + document()[:len(terms) - keep]
+        index.add(f"a{i}", ' '.join(terms))
+        index.add(f"b{i}", ' '.join(duplicate))
+        pairs.append((f"a{i}", f"b{i}"))
+
+    hits = 0
+    started = time.perf_counter()
+    for original, duplicate in pairs[:queries]:
+        hits += duplicate in [article_id for article_id, _ in index.related(original, limit=5)]
+    elapsed = time.perf_counter() - started
+    return hits / min(queries, len(pairs)), elapsed / min(queries, len(pairs)) * 1000
+
+
+if __name__ == '__main__':
+    for size in (BRUTE_FORCE_LIMIT, 1000, 4200, 10000):
+        recall, ms = _check(size)
+        print(f"📊 {size} articles: recall@5 {recall:.3f}, {ms:.2f} ms/query")
@@ -0,0 +1,163 @@
+"""
+Incremental full-text index over fetched articles.
+
+Documents get increasing internal numbers in the order they are indexed,
+so every posting list is sorted by insertion time. Posting lists are kept
+as two compact typed arrays (doc numbers and term frequencies) per term,
+and evicting documents older than the age limit is just trimming a prefix
+off each list. Queries are scored with BM25.
+"""
+import heapq
+import os
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from math import log
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+# Title terms count this many times towards term frequency
+TITLE_WEIGHT = 2
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords and single characters removed"""
+    if not text:
+        return []
+    return [t for t in TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+class SearchIndex:
+    def __init__(self, max_age_seconds=7 * 24 * 3600, evict_interval=60):
+        self.max_age_seconds = max_age_seconds
+        self.evict_interval = evict_interval
+        self.lock = threading.Lock()
+        self.postings = {}              # term -> (array('I') doc numbers, array('H') term frequencies)
+        self.doc_ids = []               # doc number - doc_base -> article id
+        self.doc_lengths = array('I')
+        self.doc_times = array('d')
+        self.doc_topics = []
+        self.doc_base = 0               # doc number of doc_ids[0]
+        self.known = {}                 # article id -> doc number
+        self.total_length = 0
+        self.last_evict = 0.0
+
+    def __len__(self):
+        return len(self.known)
+
+    def __contains__(self, article_id):
+        return article_id in self.known
+
+    def add(self, article_id, title, description='', topic='', added_at=None):
+        """Index one article; already indexed IDs are ignored. Returns True if indexed"""
+        added_at = time.time() if added_at is None else added_at
+        with self.lock:
+            if article_id in self.known:
+                return False
+            # Eviction relies on doc_times being sorted
+            if self.doc_times:
+                added_at = max(added_at, self.doc_times[-1])
+            counts = {}
+            for term in tokenize(title):
+                counts[term] = counts.get(term, 0) + TITLE_WEIGHT
+            for term in tokenize(description):
+                counts[term] = counts.get(term, 0) + 1
+
+            doc = self.doc_base + len(self.doc_ids)
+            for term, tf in counts.items():
+                docs_tfs = self.postings.get(term)
+                if docs_tfs is None:
+                    docs_tfs = self.postings[term] = (array('I'), array('H'))
+                docs_tfs[0].append(doc)
+                docs_tfs[1].append(min(tf, 0xFFFF))
+
+            length = sum(counts.values())
+            self.doc_ids.append(article_id)
+            self.doc_lengths.append(length)
+            self.doc_times.append(added_at)
+            self.doc_topics.append(topic)
+            self.known[article_id] = doc
+            self.total_length += length
+        self.maybe_evict()
+        return True
+
+    def add_articles(self, articles):
+        """Index normalized article dicts, returning how many were new"""
+        return sum(
+            1 for a in articles
+            if a.get('id') and self.add(a['id'], a.get('title', ''), a.get('description', ''), a.get('topic', ''))
+        )
+
+    def maybe_evict(self, now=None):
+        """Evict old documents, at most once per evict_interval"""
+        now = time.time() if now is None else now
+        if now - self.last_evict < self.evict_interval:
+            return 0
+        self.last_evict = now
+        return self.evict_older_than(now - self.max_age_seconds)
+
+    def evict_older_than(self, cutoff):
+        """Drop every document indexed before `cutoff` (epoch seconds)"""
+        with self.lock:
+            count = bisect_left(self.doc_times, cutoff)
+            if not count:
+                return 0
+            for article_id in self.doc_ids[:count]:
+                del self.known[article_id]
+            self.total_length -= sum(self.doc_lengths[:count])
+            del self.doc_ids[:count]
+            del self.doc_lengths[:count]
+            del self.doc_times[:count]
+            del self.doc_topics[:count]
+            self.doc_base += count
+
+            for term in list(self.postings):
+                docs, tfs = self.postings[term]
+                cut = bisect_left(docs, self.doc_base)
+                if cut == len(docs):
+                    del self.postings[term]
+                elif cut:
+                    del docs[:cut]
+                    del tfs[:cut]
+            return count
+
+    def search(self, query, limit=20, topic=None):
+        """Return [(article_id, score), ...] best first"""
+        terms = set(tokenize(query))
+        with self.lock:
+            n_docs = len(self.doc_ids)
+            if not terms or not n_docs:
+                return []
+            avg_length = self.total_length / n_docs or 1.0
+            scores = {}
+            for term in terms:
+                docs_tfs = self.postings.get(term)
+                if not docs_tfs:
+                    continue
+                docs, tfs = docs_tfs
+                df = len(docs)
+                idf = _idf(n_docs, df)
+                for doc, tf in zip(docs, tfs):
+                    i = doc - self.doc_base
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[i] / avg_length)
+                    scores[i] = scores.get(i, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+            if topic:
+                scores = {i: s for i, s in scores.items() if self.doc_topics[i] == topic}
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [(self.doc_ids[i], score) for i, score in best]
+
+
+def _idf(n_docs, df):
+    return log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+
+# Global search index instance
+search_index = SearchIndex(max_age_seconds=float(os.getenv('SEARCH_MAX_AGE_HOURS', 168)) * 3600)
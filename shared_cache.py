@@ -0,0 +1,236 @@
+"""
+Topic cache shared by every worker process on a host.
+
+Entries live in a small SQLite database (WAL mode, so readers never block
+the writer) as zlib-compressed JSON alongside their fetch time. Each process
+keeps the last decoded value per key and only re-reads the blob when the
+stored fetch time changes, so a hit costs one indexed SELECT of a float.
+
+Refreshes are coordinated with a lease row per key: the worker that inserts
+the lease calls upstream, the others wait for the new entry to appear. A
+lease expires on its own, so a worker that dies mid-refresh cannot wedge a
+key. The interface matches upstream.TopicCache, plus refresh().
+
+SharedTokenBucket keeps a token bucket in the same file, so a request
+budget (the NewsAPI daily quota) holds across worker processes and restarts.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+
+POLL_INTERVAL_SECONDS = 0.05
+
+
+class SQLiteFile:
+    """Per-thread (and per-process) connections to one SQLite file in WAL mode"""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _connection(self):
+        # sqlite3 connections must not be shared between threads
+        db = getattr(self.local, 'db', None)
+        if db is None or getattr(self.local, 'pid', None) != os.getpid():
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self.local.db = db
+            self.local.pid = os.getpid()
+        return db
+
+
+class SharedTopicCache(SQLiteFile):
+    def __init__(self, path, ttl_seconds=300, lease_seconds=30):
+        super().__init__(path)
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.lock = threading.Lock()
+        self.decoded = {}       # key -> (fetched_at, value), this process only
+        with self._connection() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, fetched_at REAL, value BLOB)")
+            db.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT, expires_at REAL)")
+
+    def _load(self, key):
+        """Return (fetched_at, value) for a key, decoding the blob only when it changed"""
+        db = self._connection()
+        row = db.execute("SELECT fetched_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with self.lock:
+            cached = self.decoded.get(key)
+        if cached is not None and cached[0] == row[0]:
+            return cached
+        row = db.execute("SELECT fetched_at, value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        entry = (row[0], json.loads(zlib.decompress(row[1])))
+        with self.lock:
+            self.decoded[key] = entry
+        return entry
+
+    def get(self, key, allow_stale=False):
+        """Return the cached value if fresh (or any age with allow_stale), else None"""
+        entry = self._load(key)
+        if entry is None:
+            return None
+        fetched_at, value = entry
+        if allow_stale or time.time() - fetched_at < self.ttl_seconds:
+            return value
+        return None
+
+    def set(self, key, value, fetched_at=None):
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        blob = zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+        self._connection().execute(
+            "INSERT OR REPLACE INTO entries (key, fetched_at, value) VALUES (?, ?, ?)",
+            (key, fetched_at, blob)
+        )
+        with self.lock:
+            self.decoded[key] = (fetched_at, value)
+
+    def entry(self, key):
+        """(fetched_at, value) regardless of age, or None"""
+        return self._load(key)
+
+    def age(self, key):
+        row = self._connection().execute("SELECT fetched_at FROM entries WHERE key = ?", (key,)).fetchone()
+        return None if row is None else time.time() - row[0]
+
+    def keys(self):
+        return [row[0] for row in self._connection().execute("SELECT key FROM entries")]
+
+    def clear(self):
+        """Drop every entry for all workers sharing the file (the next read of any key is a miss)"""
+        self._connection().execute("DELETE FROM entries")
+        with self.lock:
+            self.decoded.clear()
+
+    def try_lease(self, key):
+        """Take the refresh lease for a key unless another live worker holds it"""
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE leases.expires_at < ? OR leases.owner = excluded.owner",
+            (key, self.owner, now + self.lease_seconds, now)
+        )
+        return cursor.rowcount == 1
+
+    def release_lease(self, key):
+        self._connection().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner))
+
+    def refresh(self, key, fn, timeout=None):
+        """Run fn() (which must set() the key) in exactly one worker; the rest wait for its result
+
+        Raises TimeoutError if another worker's refresh does not land within `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.try_lease(key):
+                try:
+                    # Another worker may have finished a refresh while we were checking the lease
+                    value = self.get(key)
+                    return value if value is not None else fn()
+                finally:
+                    self.release_lease(key)
+            value = self.get(key)
+            if value is not None:
+                return value
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"timed out waiting for another worker to refresh {key}")
+            time.sleep(POLL_INTERVAL_SECONDS)
+
+
+class SharedTokenBucket(SQLiteFile):
+    """Token bucket stored in SQLite: every process using the file draws from the same tokens
+
+    Refill is computed from wall-clock time, so the bucket keeps counting across restarts.
+    Same interface as upstream.TokenBucket; `now` arguments are accepted and ignored.
+    """
+
+    def __init__(self, path, name, capacity, period_seconds):
+        super().__init__(path)
+        self.name = name
+        self.capacity = float(capacity)
+        self.rate = capacity / period_seconds
+        with self._connection() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+            db.execute("INSERT OR IGNORE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                       (name, self.capacity, time.time()))
+
+    def _refilled(self, db):
+        tokens, updated = db.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (self.name,)).fetchone()
+        now = time.time()
+        return min(self.capacity, tokens + max(0.0, now - updated) * self.rate), now
+
+    def available(self, now=None):
+        tokens, _ = self._refilled(self._connection())
+        return tokens
+
+    def try_take(self, now=None):
+        """Take one token if there is one, atomically across processes"""
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, now = self._refilled(db)
+            taken = tokens >= 1
+            if taken:
+                tokens -= 1
+            db.execute("UPDATE buckets SET tokens = ?, updated = ? WHERE name = ?", (tokens, now, self.name))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return taken
+
+
+def _worker(path, key, results):
+    cache = SharedTopicCache(path, ttl_seconds=60)
+
+    def fetch():
+        time.sleep(0.5)     # stand-in for a slow upstream call
+        cache.set(key, [{'title': f"fetched by {os.getpid()}"}])
+        results.put(os.getpid())
+        return cache.get(key)
+
+    value = cache.refresh(key, fetch, timeout=10)
+    results.put(value[0]['title'])
+
+
+if __name__ == '__main__':
+    # Self-check: many processes ask for the same cold key, exactly one fetches it
+    import multiprocessing
+    import queue
+    import sys
+    import tempfile
+
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'topic_cache.db')
+        SharedTopicCache(path)
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=_worker, args=(path, 'everything:inflation', results))
+                     for _ in range(workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        outputs = []
+        while True:
+            try:
+                outputs.append(results.get(timeout=0.5))
+            except queue.Empty:
+                break
+        fetchers = [output for output in outputs if isinstance(output, int)]
+        titles = {output for output in outputs if isinstance(output, str)}
+        print(f"📊 {workers} workers, {len(fetchers)} upstream fetch(es), {len(titles)} distinct result(s)")
+        sys.exit(0 if len(fetchers) == 1 and len(titles) == 1 else 1)
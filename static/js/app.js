@@ -21,6 +21,7 @@ document.addEventListener('DOMContentLoaded', function() {
     let userPreferences = []; // Will be loaded from server
     let isAnimating = false;
     let userEngagements = {}; // Track user's article engagements
+    let viewedArticles = new Set(); // Articles already counted as viewed this session
 
     // Initialize
     loadUserPreferences().then(() => {
@@ -202,15 +203,60 @@ document.addEventListener('DOMContentLoaded', function() {
         }
 
         const topicParams = userPreferences.map(topic => `topics=${topic}`).join('&');
+        const query = `${topicParams}&num_articles=20&compact=1`;
         
-        fetch(`/api/news?${topicParams}&num_articles=20`)
+        if (window.EventSource) {
+            streamNews(query);
+        } else {
+            fetchNews(query);
+        }
+    }
+
+    function streamNews(query) {
+        // Render the first topic that arrives instead of waiting for all of them
+        const source = new EventSource(`/api/news/stream?${query}`);
+        let received = 0;
+        
+        source.addEventListener('articles', event => {
+            const articles = (JSON.parse(event.data).articles || []).filter(article => !article.error);
+            if (articles.length === 0) return;
+            if (received === 0) {
+                currentNews = articles;
+                currentIndex = 0;
+                displayCurrentNews();
+            } else {
+                currentNews = currentNews.concat(articles);
+            }
+            received += articles.length;
+            updateNavigationButtons();
+        });
+        
+        source.addEventListener('done', () => {
+            source.close();
+            if (received === 0) {
+                showNoNews();
+            }
+        });
+        
+        source.onerror = () => {
+            source.close();
+            // Stream unsupported or interrupted before anything arrived: use the JSON endpoint
+            if (received === 0) {
+                fetchNews(query);
+            }
+        };
+    }
+
+    function fetchNews(query) {
+        fetch(`/api/news?${query}`)
             .then(response => response.json())
             .then(data => {
-                if (data.length === 0 || data[0].error) {
+                const articles = data.articles || [];
+                if (articles.length === 0 || articles[0].error) {
                     showNoNews();
                     return;
                 }
-                currentNews = data;
+                currentNews = articles;
                 currentIndex = 0;
                 displayCurrentNews();
                 updateNavigationButtons();
@@ -262,9 +308,11 @@ document.addEventListener('DOMContentLoaded', function() {
                         <h6><i class="fas fa-sticky-note"></i> Quick Notes</h6>
                         <p>${article.summary}</p>
                     </div>
-                    <div class="news-description">
-                        ${article.description}
-                    </div>
+                    ${article.description ? `
+                        <div class="news-description">
+                            ${article.description}
+                        </div>
+                    ` : ''}
                     ${article.url ? `
                         <a href="${article.url}" target="_blank" class="read-more">
                             <i class="fas fa-external-link-alt me-2"></i>
@@ -290,12 +338,12 @@ document.addEventListener('DOMContentLoaded', function() {
                     <div class="engagement-buttons">
                         <button class="engagement-btn like-btn ${userEngagement.liked ? 'active' : ''}" 
                                 data-article-id="${articleId}" 
-                                onclick="handleArticleEngagement('${articleId}', 'like')">
+                                onclick="handleArticleEngagement('${articleId}', 'like', '${article.topic}')">
                             <i class="fas fa-heart"></i>
                         </button>
                         <button class="engagement-btn dislike-btn ${userEngagement.disliked ? 'active' : ''}" 
                                 data-article-id="${articleId}" 
-                                onclick="handleArticleEngagement('${articleId}', 'dislike')">
+                                onclick="handleArticleEngagement('${articleId}', 'dislike', '${article.topic}')">
                             <i class="fas fa-thumbs-down"></i>
                         </button>
                     </div>
@@ -305,6 +353,26 @@ document.addEventListener('DOMContentLoaded', function() {
 
         newsCard.classList.add('new-card');
         setTimeout(() => newsCard.classList.remove('new-card'), 500);
+        
+        recordView(articleId, article.topic);
+    }
+
+    function recordView(articleId, topic) {
+        // Count each article once per session towards the trending lists
+        if (viewedArticles.has(articleId)) return;
+        viewedArticles.add(articleId);
+        
+        fetch('/api/article-engagement', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                article_id: articleId,
+                action: 'view',
+                topic: topic
+            })
+        }).catch(error => console.error('Error recording view:', error));
     }
 
     function handleImageLoad(img) {
@@ -322,7 +390,7 @@ document.addEventListener('DOMContentLoaded', function() {
         img.style.opacity = '1';
     }
 
-    function handleArticleEngagement(articleId, action) {
+    function handleArticleEngagement(articleId, action, topic) {
         const button = document.querySelector(`[data-article-id="${articleId}"].${action}-btn`);
         const isActive = button.classList.contains('active');
         
@@ -364,6 +432,7 @@ document.addEventListener('DOMContentLoaded', function() {
             body: JSON.stringify({
                 article_id: articleId,
                 action: action,
+                topic: topic,
                 is_active: !isActive
             })
         }).catch(error => console.error('Error updating engagement:', error));
@@ -493,9 +562,7 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     function getDefaultImage(topic) {
-        const topicConfig = getTopicConfig(topic);
-        const color = topicConfig.color.replace('text-', '').replace('danger', 'dc3545').replace('primary', '007bff').replace('warning', 'ffc107').replace('success', '28a745').replace('info', '17a2b8').replace('purple', '6f42c1').replace('orange', 'fd7e14').replace('green', '20c997');
-        return `data:image/svg+xml;charset=utf8,<svg xmlns="http://www.w3.org/2000/svg" width="400" height="300"><rect width="100%" height="100%" fill="%23${color}"/><text x="50%" y="50%" font-family="Arial" font-size="24" fill="white" text-anchor="middle" dy=".3em">${topicConfig.name}</text></svg>`;
+        return `/placeholder/${encodeURIComponent(topic || 'inflation')}.svg`;
     }
 
     // Global functions
@@ -0,0 +1,196 @@
+"""
+Local extractive summarizer for article quick notes.
+
+Sentences are ranked with TextRank over a cosine-similarity matrix built
+with NumPy. Summaries are computed in batches on a background thread and
+kept in a bounded LRU cache keyed by article ID, so request handlers only
+ever read a precomputed summary (or a cheap lead-sentence fallback the
+first time an article is seen).
+"""
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Words that end with a period without ending the sentence
+ABBREVIATIONS = frozenset(
+    "mr mrs ms dr prof sr jr st vs etc inc ltd co corp gov sen rep gen col lt sgt no jan feb mar apr jun jul aug sep sept oct nov dec u.s u.k u.n e.g i.e a.m p.m".split()
+)
+
+# A sentence ends at . ! or ? (optionally followed by a closing quote/bracket) and whitespace
+SENTENCE_END_RE = re.compile(r'[.!?]["\')\]]*\s+')
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+SUMMARY_SENTENCES = 3
+MIN_SENTENCE_LENGTH = 10
+DAMPING = 0.85
+
+
+def split_sentences(text):
+    """Split text into sentences without breaking on abbreviations, initials or decimals"""
+    if not text:
+        return []
+    text = ' '.join(text.split())
+    sentences = []
+    start = 0
+    for match in SENTENCE_END_RE.finditer(text):
+        end = match.end()
+        candidate = text[start:match.start() + 1]
+        last_word = candidate.rsplit(' ', 1)[-1].rstrip('.').lower()
+        next_char = text[end:end + 1]
+        # Not a boundary after an abbreviation/initial, or when the next word starts lowercase
+        if last_word in ABBREVIATIONS or (len(last_word) == 1 and last_word.isalpha()) or next_char.islower():
+            continue
+        sentences.append(text[start:end].strip())
+        start = end
+    if start < len(text):
+        sentences.append(text[start:].strip())
+    return [s for s in sentences if s]
+
+
+def format_notes(sentences):
+    """Render sentences as the bullet list the cards display"""
+    notes = [f"• {s}" for s in sentences if len(s) > MIN_SENTENCE_LENGTH]
+    if not notes:
+        return "• Key information not available in this format"
+    return '\n'.join(notes)
+
+
+def lead_notes(text, count=SUMMARY_SENTENCES):
+    """Cheap fallback: the first few sentences"""
+    if not text:
+        return "No content available for quick notes."
+    return format_notes(split_sentences(text)[:count])
+
+
+def textrank(sentences, iterations=50, tolerance=1e-6):
+    """Return a TextRank score per sentence"""
+    n = len(sentences)
+    if n <= 2:
+        return np.ones(n)
+
+    tokens = [WORD_RE.findall(s.lower()) for s in sentences]
+    vocabulary = {}
+    for words in tokens:
+        for word in words:
+            vocabulary.setdefault(word, len(vocabulary))
+    counts = np.zeros((n, max(len(vocabulary), 1)), dtype=np.float32)
+    for row, words in enumerate(tokens):
+        for word in words:
+            counts[row, vocabulary[word]] += 1
+
+    norms = np.linalg.norm(counts, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    unit = counts / norms
+    similarity = unit @ unit.T
+    np.fill_diagonal(similarity, 0)
+
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    # Sentences that share no words with any other link uniformly
+    transition = np.where(row_sums > 0, similarity / np.where(row_sums == 0, 1, row_sums), 1.0 / n)
+
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(iterations):
+        updated = (1 - DAMPING) / n + DAMPING * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < tolerance:
+            scores = updated
+            break
+        scores = updated
+    return scores
+
+
+def summarize(text, count=SUMMARY_SENTENCES):
+    """Extractive summary: the top ranked sentences, in their original order"""
+    if not text:
+        return "No content available for quick notes."
+    sentences = [s for s in split_sentences(text) if len(s) > MIN_SENTENCE_LENGTH]
+    if len(sentences) <= count:
+        return format_notes(sentences)
+    scores = textrank(sentences)
+    top = sorted(np.argsort(-scores, kind='stable')[:count])
+    return format_notes([sentences[i] for i in top])
+
+
+class SummaryCache:
+    """Bounded LRU of article ID -> summary, filled by a background worker thread"""
+
+    def __init__(self, max_entries=5000, batch_size=32):
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.summaries = OrderedDict()
+        self.pending = set()
+        self.queue = queue.Queue()
+        self.worker = None
+
+    def get(self, article_id):
+        with self.lock:
+            summary = self.summaries.get(article_id)
+            if summary is not None:
+                self.summaries.move_to_end(article_id)
+            return summary
+
+    def put(self, article_id, summary):
+        with self.lock:
+            self.summaries[article_id] = summary
+            self.summaries.move_to_end(article_id)
+            self.pending.discard(article_id)
+            while len(self.summaries) > self.max_entries:
+                self.summaries.popitem(last=False)
+
+    def request(self, article_id, text):
+        """Queue an article for summarizing unless it is cached or already queued"""
+        with self.lock:
+            if article_id in self.summaries or article_id in self.pending:
+                return
+            self.pending.add(article_id)
+        self._ensure_worker()
+        self.queue.put((article_id, text))
+
+    def summary_for(self, article_id, text):
+        """Cached summary, or the lead sentences while the real one is computed in the background"""
+        summary = self.get(article_id)
+        if summary is None:
+            self.request(article_id, text)
+            return lead_notes(text)
+        return summary
+
+    def _ensure_worker(self):
+        if self.worker is None or not self.worker.is_alive():
+            self.worker = threading.Thread(target=self._run, name='summarizer', daemon=True)
+            self.worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            for article_id, text in batch:
+                try:
+                    self.put(article_id, summarize(text))
+                except Exception as e:
+                    print(f"ERROR: Failed to summarize {article_id}: {str(e)}")
+                    with self.lock:
+                        self.pending.discard(article_id)
+
+    def wait_idle(self, timeout=None):
+        """Block until everything queued so far has been summarized (used by scripts and benchmarks)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                if not self.pending:
+                    return True
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+
+
+# Global summary cache instance
+summary_cache = SummaryCache(max_entries=int(os.getenv('SUMMARY_CACHE_SIZE', 5000)))
@@ -0,0 +1,45 @@
+"""
+Keyword classifier that splits a combined multi-topic result back into topics.
+
+Weights come straight from each topic's NewsAPI query terms, so an article
+is assigned to the topic whose query it best matches: the fraction of that
+topic's terms it contains, with title matches counting extra. This mirrors
+why upstream returned the article for the OR-combined query in the first
+place, and costs one tokenization plus a dict lookup per token.
+"""
+from search_index import tokenize
+
+TITLE_BONUS = 0.5
+
+
+class TopicClassifier:
+    def __init__(self, topic_queries):
+        """topic_queries: topic -> query string (e.g. the 'query' values of TOPIC_CONFIGS)"""
+        self.term_topics = {}       # term -> [(topic, weight), ...]
+        self.topic_order = list(topic_queries)
+        for topic, query in topic_queries.items():
+            terms = set(tokenize(query))
+            for term in terms:
+                self.term_topics.setdefault(term, []).append((topic, 1.0 / len(terms)))
+
+    def scores(self, title, description='', topics=None):
+        """Return topic -> score for an article, restricted to `topics` if given"""
+        allowed = set(topics) if topics else None
+        title_terms = set(tokenize(title))
+        body_terms = set(tokenize(description))
+        scores = {}
+        for term in title_terms | body_terms:
+            for topic, weight in self.term_topics.get(term, ()):
+                if allowed is not None and topic not in allowed:
+                    continue
+                bonus = weight * TITLE_BONUS if term in title_terms else 0.0
+                scores[topic] = scores.get(topic, 0.0) + weight + bonus
+        return scores
+
+    def classify(self, title, description='', topics=None):
+        """Best matching topic, or None when no query term appears; ties go to the earlier topic"""
+        scores = self.scores(title, description, topics)
+        if not scores:
+            return None
+        order = topics or self.topic_order
+        return max(scores, key=lambda topic: (scores[topic], -order.index(topic) if topic in order else 0))
@@ -0,0 +1,209 @@
+"""
+Time-decayed engagement counters and per-topic trending lists.
+
+Each article keeps one exponentially decayed counter per event type (view,
+like, dislike). Counters use forward decay: an event at time t adds
+weight * 2 ** ((t - epoch) / half_life) to the raw counter, and the value at
+time `now` is raw * 2 ** (-(now - epoch) / half_life). Every counter decays
+at the same rate, so an event is one multiply-add with no sweep over old
+articles, and two articles compare the same whatever time they are read at.
+When the exponent grows large the epoch moves forward and every counter is
+rescaled once. That is the only O(n) step, and it runs every few weeks.
+
+Because of that, the trending order only changes when an event arrives.
+Each topic keeps a top-k heap that is updated from the event itself, so
+reading a trending list costs O(k) regardless of how many articles exist.
+An article whose score drops is not backfilled from outside the top k;
+it is replaced by the next article whose event lifts it above the minimum.
+
+Undoing a like or dislike removes the raw amount the most recent matching
+event added, which is exactly that event's decayed contribution now. A
+subtraction at the current time would remove more than the event still
+counts for. Only the last UNDO_DEPTH events per article and type can be
+undone; an undo with nothing to remove is ignored.
+"""
+import heapq
+import threading
+import time
+from collections import deque
+
+EVENT_TYPES = ('views', 'likes', 'dislikes')
+# Contribution of one event of each type to the trending score
+SCORE_WEIGHTS = {'views': 1.0, 'likes': 4.0, 'dislikes': -2.0}
+# Rebase before 2 ** exponent gets anywhere near float overflow
+MAX_EXPONENT = 200
+# Articles whose every counter has decayed below this are forgotten at a rebase
+FORGET_BELOW = 1e-3
+# Recent events per article and type whose contribution can still be undone
+UNDO_DEPTH = 32
+ALL_TOPICS = '*'
+
+
+class TopK:
+    """Top-k members by score: a min-heap with lazy deletion of superseded entries"""
+
+    def __init__(self, k):
+        self.k = k
+        self.scores = {}    # member -> current score
+        self.heap = []      # (score, member); entries whose score no longer matches are stale
+
+    def update(self, member, score):
+        if member in self.scores:
+            if score <= 0:
+                del self.scores[member]
+            else:
+                self.scores[member] = score
+                heapq.heappush(self.heap, (score, member))
+        elif score > 0 and (len(self.scores) < self.k or score > self._min_score()):
+            if len(self.scores) >= self.k:
+                self._pop_min()
+            self.scores[member] = score
+            heapq.heappush(self.heap, (score, member))
+        if len(self.heap) > 4 * self.k:
+            self.heap = [(score, member) for member, score in self.scores.items()]
+            heapq.heapify(self.heap)
+
+    def _clean(self):
+        while self.heap and self.scores.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+
+    def _min_score(self):
+        self._clean()
+        return self.heap[0][0]
+
+    def _pop_min(self):
+        self._clean()
+        _, member = heapq.heappop(self.heap)
+        del self.scores[member]
+
+    def rescale(self, factor, keep=None):
+        """Multiply every score by factor, dropping members not in `keep` (when given)"""
+        self.scores = {member: score * factor for member, score in self.scores.items()
+                       if keep is None or member in keep}
+        self.heap = [(score, member) for member, score in self.scores.items()]
+        heapq.heapify(self.heap)
+
+    def top(self, limit):
+        return sorted(self.scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+class TrendingTracker:
+    def __init__(self, half_life_hours=6.0, k=50):
+        self.half_life = half_life_hours * 3600
+        self.k = k
+        self.lock = threading.Lock()
+        self.epoch = time.time()
+        self.counters = {}      # article id -> [views, likes, dislikes] raw forward-decayed values
+        self.topics = {}        # article id -> topic
+        self.added = {}         # article id -> {event: deque of raw amounts added by recent events}
+        self.top = {}           # topic (or ALL_TOPICS) -> TopK
+
+    def __len__(self):
+        with self.lock:
+            return len(self.counters)
+
+    def _decay(self, now):
+        """Factor turning raw counters into values at `now` (underflows to 0 rather than overflowing)"""
+        return 2.0 ** (-(now - self.epoch) / self.half_life)
+
+    def _rebase(self, now):
+        factor = self._decay(now)
+        counters = {}
+        for article_id, counter in self.counters.items():
+            counter = [value * factor for value in counter]
+            if max(counter) >= FORGET_BELOW:
+                counters[article_id] = counter
+        self.counters = counters
+        self.topics = {article_id: topic for article_id, topic in self.topics.items() if article_id in counters}
+        self.added = {article_id: {event: deque((amount * factor for amount in amounts), maxlen=UNDO_DEPTH)
+                                   for event, amounts in added.items()}
+                      for article_id, added in self.added.items() if article_id in counters}
+        for top in self.top.values():
+            # Forgotten articles have no counters left, so they must leave the trending lists too
+            top.rescale(factor, keep=counters)
+        self.top = {key: top for key, top in self.top.items() if top.scores}
+        self.epoch = now
+
+    def _score(self, counter):
+        return sum(SCORE_WEIGHTS[event] * value for event, value in zip(EVENT_TYPES, counter))
+
+    def _update_top(self, article_id, counter):
+        topic = self.topics.get(article_id)
+        score = self._score(counter)
+        for key in (topic, ALL_TOPICS) if topic else (ALL_TOPICS,):
+            self.top.setdefault(key, TopK(self.k)).update(article_id, score)
+
+    def record(self, article_id, topic, event, weight=1.0, now=None):
+        """Count one event ('views', 'likes' or 'dislikes') with a positive weight"""
+        now = time.time() if now is None else now
+        with self.lock:
+            if (now - self.epoch) / self.half_life > MAX_EXPONENT:
+                self._rebase(now)
+            counter = self.counters.setdefault(article_id, [0.0] * len(EVENT_TYPES))
+            amount = weight / self._decay(now)
+            counter[EVENT_TYPES.index(event)] += amount
+            added = self.added.setdefault(article_id, {})
+            added.setdefault(event, deque(maxlen=UNDO_DEPTH)).append(amount)
+            if topic:
+                self.topics[article_id] = topic
+            self._update_top(article_id, counter)
+
+    def undo(self, article_id, event):
+        """Remove the most recent event of this type for the article; False if there is none to remove"""
+        with self.lock:
+            amounts = self.added.get(article_id, {}).get(event)
+            if not amounts:
+                return False
+            counter = self.counters[article_id]
+            index = EVENT_TYPES.index(event)
+            counter[index] = max(0.0, counter[index] - amounts.pop())
+            self._update_top(article_id, counter)
+            return True
+
+    def rates(self, article_ids, now=None):
+        """Current decayed counters and score for a batch of articles (missing ids are omitted)"""
+        now = time.time() if now is None else now
+        with self.lock:
+            decay = self._decay(now)
+            result = {}
+            for article_id in article_ids:
+                counter = self.counters.get(article_id)
+                if counter is not None:
+                    result[article_id] = dict(zip(EVENT_TYPES, (value * decay for value in counter)),
+                                              score=self._score(counter) * decay)
+            return result
+
+    def trending(self, topic=None, limit=10, now=None):
+        """[(article id, decayed score)] best first, for one topic or across all of them"""
+        now = time.time() if now is None else now
+        with self.lock:
+            top = self.top.get(topic or ALL_TOPICS)
+            if top is None:
+                return []
+            decay = self._decay(now)
+            return [(article_id, score * decay) for article_id, score in top.top(limit)]
+
+    def to_dict(self):
+        with self.lock:
+            return {'epoch': self.epoch, 'half_life': self.half_life,
+                    'counters': {article_id: list(counter) for article_id, counter in self.counters.items()},
+                    'topics': dict(self.topics),
+                    'added': {article_id: {event: list(amounts) for event, amounts in added.items()}
+                              for article_id, added in self.added.items()}}
+
+    def load_dict(self, data):
+        """Replace the state with a to_dict() snapshot, rebuilding the top-k heaps"""
+        if not data or data.get('half_life') != self.half_life:
+            return False
+        with self.lock:
+            self.epoch = data['epoch']
+            self.counters = {article_id: list(counter) for article_id, counter in data['counters'].items()}
+            self.topics = dict(data['topics'])
+            self.added = {article_id: {event: deque(amounts, maxlen=UNDO_DEPTH) for event, amounts in added.items()}
+                          for article_id, added in data.get('added', {}).items()}
+            self.top = {}
+            for article_id, counter in self.counters.items():
+                self._update_top(article_id, counter)
+            if (time.time() - self.epoch) / self.half_life > MAX_EXPONENT:
+                self._rebase(time.time())
+        return True
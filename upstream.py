@@ -0,0 +1,267 @@
+"""
+Guards around upstream (NewsAPI) calls.
+
+- SingleFlight coalesces concurrent calls for the same key: the first caller
+  makes the request and everyone else waiting on that key shares its result.
+- QuotaGovernor enforces per-minute and daily request budgets with token
+  buckets, so a burst of users cannot burn the daily NewsAPI quota. With a
+  shared cache file the daily bucket lives in it (SharedTokenBucket), so the
+  budget holds across worker processes and restarts.
+- TopicCache keeps the last good result per key with its fetch time, served
+  while fresh and kept afterwards as a stale fallback for degraded mode.
+  With TOPIC_CACHE_PATH set, shared_cache.SharedTopicCache is used instead so
+  every worker process on the host shares one copy and one refresh per key.
+- CircuitBreaker stops calling an upstream endpoint that is failing or slow,
+  probing it again after a cool-down, so requests fail fast to the cache.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from shared_cache import SharedTopicCache, SharedTokenBucket
+
+
+class QuotaExhausted(Exception):
+    """Raised instead of calling upstream when the request budget is spent"""
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling upstream while its circuit breaker is open"""
+
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}     # key -> [event, result, error]
+
+    def do(self, key, fn, timeout=None):
+        """Run fn() once per key at a time; concurrent callers get the same result (or exception)
+
+        Followers give up with TimeoutError after `timeout` seconds; the leader's call carries on.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = [threading.Event(), None, None]
+        if not leader:
+            if not call[0].wait(timeout):
+                raise TimeoutError(f"timed out waiting for in-flight call {key}")
+            if call[2] is not None:
+                raise call[2]
+            return call[1]
+        try:
+            call[1] = fn()
+            return call[1]
+        except Exception as e:
+            call[2] = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call[0].set()
+
+
+class TokenBucket:
+    def __init__(self, capacity, period_seconds):
+        self.capacity = float(capacity)
+        self.rate = capacity / period_seconds
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self, now):
+        self._refill(now)
+        return self.tokens
+
+    def try_take(self, now):
+        self._refill(now)
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class QuotaGovernor:
+    def __init__(self, per_minute=30, per_day=100, path=None):
+        """With `path`, the daily bucket is kept in that SQLite file and shared by every process using it"""
+        self.lock = threading.Lock()
+        self.buckets = {
+            'minute': TokenBucket(per_minute, 60),
+            'day': SharedTokenBucket(path, 'newsapi_day', per_day, 24 * 3600) if path else TokenBucket(per_day, 24 * 3600),
+        }
+        self.allowed = 0
+        self.denied = 0
+
+    def try_acquire(self):
+        """Take one token from every bucket, or none if any bucket is empty"""
+        with self.lock:
+            now = time.monotonic()
+            # The daily bucket is taken last: it may be shared, and a shared take cannot be rolled back here
+            if self.buckets['minute'].available(now) < 1 or not self.buckets['day'].try_take(now):
+                self.denied += 1
+                return False
+            self.buckets['minute'].tokens -= 1
+            self.allowed += 1
+            return True
+
+    def status(self):
+        with self.lock:
+            now = time.monotonic()
+            return {
+                'remaining': {name: int(bucket.available(now)) for name, bucket in self.buckets.items()},
+                'allowed': self.allowed,
+                'denied': self.denied,
+            }
+
+
+class TopicCache:
+    def __init__(self, ttl_seconds=300):
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.entries = {}   # key -> (fetched_at, value)
+
+    def get(self, key, allow_stale=False):
+        """Return the cached value if fresh (or any age with allow_stale), else None"""
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None:
+            return None
+        fetched_at, value = entry
+        if allow_stale or time.time() - fetched_at < self.ttl_seconds:
+            return value
+        return None
+
+    def set(self, key, value, fetched_at=None):
+        with self.lock:
+            self.entries[key] = (time.time() if fetched_at is None else fetched_at, value)
+
+    def entry(self, key):
+        """(fetched_at, value) regardless of age, or None"""
+        with self.lock:
+            return self.entries.get(key)
+
+    def age(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+        return None if entry is None else time.time() - entry[0]
+
+    def keys(self):
+        with self.lock:
+            return list(self.entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def refresh(self, key, fn, timeout=None):
+        """Run fn() to refresh a key; SingleFlight already coalesces callers within a process"""
+        return fn()
+
+
+class CircuitBreaker:
+    """Closed -> open when recent calls fail or run slow too often; open -> half-open after a cool-down
+
+    In half-open state a single probe call is let through: success closes the
+    breaker, failure opens it again for another cool-down.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, name, window_seconds=60, min_calls=5, error_rate=0.5,
+                 slow_call_seconds=2.0, slow_rate=0.5, cooldown_seconds=30):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.cooldown_seconds = cooldown_seconds
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.calls = deque()     # (time, ok, seconds)
+
+    def allow(self):
+        """Whether a call may go upstream now"""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+                self.state = self.HALF_OPEN
+                self.probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def release(self):
+        """Give back a slot from allow() without recording anything, for a call that was never made"""
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.probe_in_flight = False
+
+    def record(self, ok, seconds):
+        """Record the outcome of a call that allow() let through"""
+        with self.lock:
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN:
+                self.probe_in_flight = False
+                if ok and seconds < self.slow_call_seconds:
+                    self.state = self.CLOSED
+                    self.calls.clear()
+                else:
+                    self._open(now)
+                return
+
+            self.calls.append((now, ok, seconds))
+            while self.calls and now - self.calls[0][0] > self.window_seconds:
+                self.calls.popleft()
+            if self.state == self.CLOSED and len(self.calls) >= self.min_calls:
+                total = len(self.calls)
+                errors = sum(1 for _, call_ok, _ in self.calls if not call_ok)
+                slow = sum(1 for _, _, call_seconds in self.calls if call_seconds >= self.slow_call_seconds)
+                if errors / total >= self.error_rate or slow / total >= self.slow_rate:
+                    self._open(now)
+
+    def _open(self, now):
+        self.state = self.OPEN
+        self.opened_at = now
+        self.calls.clear()
+        print(f"WARNING: Circuit breaker for {self.name} opened")
+
+    def status(self):
+        with self.lock:
+            return {'state': self.state, 'recent_calls': len(self.calls)}
+
+
+# Global instances shared by every request in this process
+single_flight = SingleFlight()
+# Shared by every worker on the host; empty keeps the cache and daily budget per process
+SHARED_CACHE_PATH = os.getenv('TOPIC_CACHE_PATH', 'topic_cache.db')
+quota_governor = QuotaGovernor(
+    per_minute=int(os.getenv('NEWSAPI_PER_MINUTE_BUDGET', 30)),
+    per_day=int(os.getenv('NEWSAPI_DAILY_BUDGET', 100)),
+    path=SHARED_CACHE_PATH or None
+)
+if SHARED_CACHE_PATH:
+    topic_cache = SharedTopicCache(SHARED_CACHE_PATH, ttl_seconds=int(os.getenv('TOPIC_CACHE_TTL_SECONDS', 300)))
+else:
+    topic_cache = TopicCache(ttl_seconds=int(os.getenv('TOPIC_CACHE_TTL_SECONDS', 300)))
+
+# Per-request time budget for NewsAPI calls, including waiting on a coalesced call
+NEWSAPI_LATENCY_BUDGET = float(os.getenv('NEWSAPI_LATENCY_BUDGET_SECONDS', 3.0))
+circuit_breakers = {
+    endpoint: CircuitBreaker(
+        f"newsapi/{endpoint}",
+        error_rate=float(os.getenv('NEWSAPI_BREAKER_ERROR_RATE', 0.5)),
+        slow_call_seconds=float(os.getenv('NEWSAPI_BREAKER_SLOW_SECONDS', 2.0)),
+        cooldown_seconds=float(os.getenv('NEWSAPI_BREAKER_COOLDOWN_SECONDS', 30))
+    )
+    for endpoint in ('everything',)
+}
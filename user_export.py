@@ -0,0 +1,218 @@
+"""
+Streaming export pipeline for user data.
+
+Rows are produced one at a time from the user stores and serialized into
+small chunks, so an export never holds the whole dataset in memory. Used by
+the admin export routes in app.py and by export_users.py.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+# Column key -> (header, extractor). Order here is the default column order.
+EXPORT_COLUMNS = {
+    'user_id': ('User ID', lambda uid, u: uid),
+    'name': ('Name', lambda uid, u: u.get('name', 'N/A')),
+    'phone': ('Phone', lambda uid, u: u.get('phone', 'N/A')),
+    'email': ('Email', lambda uid, u: u.get('email', 'N/A')),
+    'created_at': ('Created At', lambda uid, u: u.get('created_at', 'N/A')),
+    'preferences': ('Preferences', lambda uid, u: ', '.join(u.get('preferences', [])) if u.get('preferences') else 'None'),
+    'liked_topics_count': ('Liked Topics Count', lambda uid, u: len(u.get('liked_topics', {}))),
+    'passed_topics_count': ('Passed Topics Count', lambda uid, u: len(u.get('passed_topics', {}))),
+    'total_engagements': ('Total Engagements', lambda uid, u: len(u.get('liked_topics', {})) + len(u.get('passed_topics', {}))),
+}
+
+# Columns whose values are always integers (typed formats store them as numbers)
+INTEGER_COLUMNS = frozenset(('liked_topics_count', 'passed_topics_count', 'total_engagements'))
+
+# Rows are buffered into chunks of roughly this many bytes before being yielded
+CHUNK_SIZE = 64 * 1024
+
+# Characters XML 1.0 does not allow at all, even escaped; Excel refuses a sheet containing them
+XML_INVALID_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def parse_columns(value):
+    """Parse a comma separated column list, keeping only known column keys"""
+    if not value:
+        return list(EXPORT_COLUMNS)
+    columns = [c.strip() for c in value.split(',') if c.strip() in EXPORT_COLUMNS]
+    return columns or list(EXPORT_COLUMNS)
+
+
+def column_headers(columns):
+    """Return the display headers for the given column keys"""
+    return [EXPORT_COLUMNS[c][0] for c in columns]
+
+
+def _parse_date(value):
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def build_filter(preference=None, created_after=None, created_before=None, search=None):
+    """Build a predicate over (user_id, user_data) from export filter options"""
+    after = _parse_date(created_after)
+    before = _parse_date(created_before)
+    search = search.lower() if search else None
+
+    def matches(user_id, user_data):
+        if preference and preference not in (user_data.get('preferences') or []):
+            return False
+        if after or before:
+            created = _parse_date(user_data.get('created_at'))
+            if created is None:
+                return False
+            if after and created < after:
+                return False
+            if before and created > before:
+                return False
+        if search:
+            haystack = f"{user_data.get('name', '')} {user_data.get('phone', '')} {user_data.get('email', '')}".lower()
+            if search not in haystack:
+                return False
+        return True
+
+    return matches
+
+
+def iter_all_users(secure_users, plain_users):
+    """Yield (user_id, user_data) from both user stores without building a merged copy
+
+    Records in the secure (encrypted) store win over plain duplicates.
+    """
+    yield from secure_users.items()
+    for user_id, user_data in plain_users.items():
+        if user_id not in secure_users:
+            yield user_id, user_data
+
+
+def iter_user_rows(users, columns=None, predicate=None):
+    """Yield one list of cell values per user from an iterable of (user_id, user_data) pairs"""
+    columns = columns or list(EXPORT_COLUMNS)
+    extractors = [EXPORT_COLUMNS[c][1] for c in columns]
+    for user_id, user_data in users:
+        if predicate and not predicate(user_id, user_data):
+            continue
+        yield [extract(user_id, user_data) for extract in extractors]
+
+
+def stream_csv(rows, headers):
+    """Serialize rows as CSV, yielding UTF-8 encoded chunks"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkSink:
+    """Write-only, non-seekable file object that collects bytes for a generator to drain"""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+_XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Users" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_cell(value):
+    """Render one cell as inline-string or numeric XML"""
+    if isinstance(value, bool):
+        value = str(value)
+    if isinstance(value, (int, float)):
+        return f'<c t="n"><v>{value}</v></c>'
+    text = XML_INVALID_RE.sub('', str(value))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def _xlsx_row(index, values):
+    return f'<row r="{index}">' + ''.join(_xlsx_cell(v) for v in values) + '</row>'
+
+
+def stream_xlsx(rows, headers):
+    """Serialize rows as an .xlsx workbook, yielding zip chunks as the sheet is written
+
+    The worksheet uses inline strings so no shared-string table has to be
+    built up front, and the zip is written to a non-seekable sink so each
+    entry is emitted with a trailing data descriptor as it is produced.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        yield sink.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(1, headers).encode('utf-8'))
+            for index, row in enumerate(rows, start=2):
+                sheet.write(_xlsx_row(index, row).encode('utf-8'))
+                if sink.size >= CHUNK_SIZE:
+                    yield sink.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv', 'csv'),
+    'xlsx': (stream_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
@@ -0,0 +1,107 @@
+"""
+Warm-start snapshot of processed topic results, their engagement counters
+and the decayed trending counters.
+
+The app writes the snapshot periodically and on shutdown, and loads it
+before serving traffic. A worker that wakes from sleep then answers its
+first /api/news from the snapshot while a background refresh fetches fresh
+results. The snapshot is one zlib-compressed JSON file, replaced atomically
+so a crash mid-write leaves the previous snapshot intact. Each save writes
+its own temporary file, so workers saving at the same time do not interleave;
+the last replace wins.
+"""
+import json
+import os
+import tempfile
+import time
+import zlib
+
+SNAPSHOT_VERSION = 1
+
+
+class WarmStartSnapshot:
+    def __init__(self, path):
+        self.path = path
+
+    def save(self, topic_cache, article_data, trending=None):
+        """Write every cached topic result, engagement for the articles in them and the trending counters
+
+        Returns the number of topic results written (0 and no write when there is nothing to save).
+        """
+        topics = {}
+        article_ids = set()
+        for key in topic_cache.keys():
+            entry = topic_cache.entry(key)
+            if entry is None:
+                continue
+            topics[key] = entry
+            articles = entry[1].values() if isinstance(entry[1], dict) else [entry[1]]
+            for topic_articles in articles:
+                article_ids.update(article['id'] for article in topic_articles if 'id' in article)
+        if not topics and not (trending is not None and len(trending)):
+            return 0
+
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'saved_at': time.time(),
+            'topics': topics,
+            'engagement': {article_id: article_data[article_id]
+                           for article_id in article_ids if article_id in article_data},
+            'trending': trending.to_dict() if trending is not None else None,
+        }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory or '.', prefix=os.path.basename(self.path) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(zlib.compress(json.dumps(snapshot, separators=(',', ':')).encode('utf-8')))
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return len(topics)
+
+    def load(self):
+        """Return the snapshot dict, or None if there is no usable snapshot"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                snapshot = json.loads(zlib.decompress(f.read()))
+        except Exception as e:
+            print(f"ERROR: Failed to read warm-start snapshot: {str(e)}")
+            return None
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            return None
+        return snapshot
+
+    def restore(self, topic_cache, article_data, trending=None):
+        """Seed the topic cache, engagement counters and trending counters from the snapshot
+
+        Entries keep their original fetch time and are only seeded where the
+        cache has nothing newer. Engagement is only added for articles that
+        have none yet. Returns (every cached key that is now past its TTL and
+        needs a refresh, whether article_data changed). Stale keys are taken
+        from the cache itself, since a persistent cache (SharedTopicCache) may
+        already hold the same entries as the snapshot.
+        """
+        snapshot = self.load()
+        engagement_added = False
+        if snapshot is not None:
+            for key, (fetched_at, value) in snapshot['topics'].items():
+                current = topic_cache.entry(key)
+                if current is None or current[0] < fetched_at:
+                    topic_cache.set(key, value, fetched_at=fetched_at)
+
+            if trending is not None:
+                trending.load_dict(snapshot.get('trending'))
+
+            for article_id, engagement in snapshot['engagement'].items():
+                if article_id not in article_data:
+                    article_data[article_id] = engagement
+                    engagement_added = True
+
+        stale_keys = [key for key in topic_cache.keys()
+                      if topic_cache.entry(key) is not None and topic_cache.get(key) is None]
+        return stale_keys, engagement_added